@@ -0,0 +1,145 @@
+"""Run viewer operations over many images without a GUI.
+
+Run with: python batch.py INPUT OUTPUT_DIR [--steps "Grayscale,Canny:low=30;high=90"]
+
+INPUT is a directory or a glob pattern such as "photos/**/*.jpg". Results
+keep their paths relative to the folder all inputs share, so images with
+the same name in different folders don't overwrite each other. Images
+are sent to a process pool in chunks, and only a bounded number of chunks
+is submitted at a time so memory stays flat however many files match.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import cv2
+from operations import parse_steps, run_steps
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+
+def find_images(pattern):
+    """Image files in a directory, or matching a (recursive) glob pattern"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*")
+    return sorted(path for path in glob.glob(pattern, recursive=True)
+                  if path.lower().endswith(IMAGE_EXTENSIONS) and os.path.isfile(path))
+
+
+def output_paths(paths, output_dir):
+    """Where the result of each path goes, keeping the folders below the
+    one all paths have in common"""
+    paths = [os.path.abspath(path) for path in paths]
+    root = os.path.commonpath([os.path.dirname(path) for path in paths]) if paths else ""
+    return [os.path.join(output_dir, os.path.relpath(path, root)) for path in paths]
+
+
+def process_chunk(jobs, steps):
+    """Process a chunk of (input path, output path) jobs in a worker process.
+    
+    Results are written by the worker, so only (path, seconds, pixels,
+    error) tuples travel back to the parent.
+    """
+    results = []
+    for path, output_path in jobs:
+        start = time.perf_counter()
+        image = cv2.imread(path)
+        if image is None:
+            results.append((path, None, 0, "could not read image"))
+            continue
+        image = run_steps(image, steps)
+        try:
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        except OSError:
+            # Reported as a failed write just below
+            pass
+        if not cv2.imwrite(output_path, image):
+            results.append((path, None, 0, "could not write result"))
+            continue
+        results.append((path, time.perf_counter() - start, image.shape[0] * image.shape[1], None))
+    return results
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def run_batch(paths, output_dir, steps, workers=None, chunk_size=4, max_in_flight=None):
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count()
+    max_in_flight = max_in_flight or 2 * workers
+    jobs = list(zip(paths, output_paths(paths, output_dir)))
+    chunks = (jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size))
+    
+    start = time.perf_counter()
+    done = failed = pixels = 0
+    latencies = []
+    pending = set()
+    with ProcessPoolExecutor(workers) as pool:
+        while True:
+            # Keep every worker busy without queueing the whole batch
+            while len(pending) < max_in_flight:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                pending.add(pool.submit(process_chunk, chunk, steps))
+            if not pending:
+                break
+            
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                for path, seconds, image_pixels, error in future.result():
+                    done += 1
+                    if error:
+                        failed += 1
+                        print(f"[{done}/{len(paths)}] {path}: {error}", file=sys.stderr)
+                    else:
+                        latencies.append(seconds)
+                        pixels += image_pixels
+                        print(f"[{done}/{len(paths)}] {path} ({seconds * 1000:.0f} ms)")
+    
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    rate = done / elapsed if elapsed > 0 else 0.0
+    megapixels = pixels / 1e6 / elapsed if elapsed > 0 else 0.0
+    print(f"Processed {done} images in {elapsed:.2f} s with {workers} workers, {failed} failed")
+    print(f"Throughput: {rate:.1f} images/s, {megapixels:.1f} MP/s")
+    print(f"Latency per image: p50 {percentile(latencies, 0.5) * 1000:.0f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.0f} ms, "
+          f"max {percentile(latencies, 1.0) * 1000:.0f} ms")
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply OpenCV viewer operations to many images")
+    parser.add_argument("input", help="directory or glob pattern of images")
+    parser.add_argument("output_dir", help="directory the results are written to")
+    parser.add_argument("--steps", default="Grayscale",
+                        help="operations to apply, e.g. 'Grayscale,Canny:low=30;high=90'")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=4,
+                        help="images sent to a worker at a time")
+    parser.add_argument("--max-in-flight", type=int, default=None,
+                        help="chunks submitted at once (default: twice the workers)")
+    args = parser.parse_args()
+    
+    try:
+        steps = parse_steps(args.steps)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    paths = find_images(args.input)
+    if not paths:
+        parser.error(f"no images found for {args.input}")
+    sys.exit(run_batch(paths, args.output_dir, steps, args.workers,
+                       args.chunk_size, args.max_in_flight))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,510 @@
 import sys
+import os
+import itertools
+import math
+import threading
+import time
+from collections import OrderedDict
 import cv2
 import numpy as np
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtCore import (Qt, QTimer, QObject, QRunnable, QThreadPool, QPointF, QRectF,
+                          pyqtSignal)
+from PyQt6.QtGui import (QImage, QPixmap, QKeySequence, QPainter, QPainterPath, QColor, QPen,
+                         QFontDatabase)
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, 
                            QVBoxLayout, QWidget, QPushButton, QHBoxLayout,
-                           QFileDialog, QMessageBox)
+                           QFileDialog, QMessageBox, QListWidget, QInputDialog,
+                           QProgressBar, QStackedWidget, QSlider, QDockWidget)
+import tiled_image
+import video
+from operations import OPERATIONS, detect_edges, make_step, describe_step, run_steps, load_image
+from tiled_image import TILE_SIZE
+
+# Wait this long after the last resize event before rescaling the image
+RESIZE_DELAY_MS = 50
+
+# Number of label sizes to keep scaled pixmaps for
+SCALED_CACHE_SIZE = 8
+
+# Memory budget for cached pipeline stage outputs
+STAGE_CACHE_BYTES = 512 * 1024 * 1024
+
+# Mapped BMP files at least this large open in the tiled viewing mode
+TILED_MIN_PIXELS = 64 * 1024 * 1024
+
+# Rendered tiles kept in memory (about 192 KB each)
+MAX_TILES = 512
+
+# Extra pixels read around each tile so operations such as Canny have
+# context at tile borders
+TILE_HALO = 8
+
+# Decoded frames buffered ahead of the display
+VIDEO_BUFFER_FRAMES = 8
+
+# Playback clock resolution and how often the video statistics refresh
+VIDEO_TICK_MS = 5
+VIDEO_STATS_MS = 500
+
+# Canny thresholds are previewed on a proxy of about this many pixels
+# while a slider is dragged
+PREVIEW_PIXELS = 2 * 1024 * 1024
+MAX_THRESHOLD = 500
+
+# Pixels sampled for the instant histogram before the exact one is ready
+HISTOGRAM_SAMPLE_PIXELS = 256 * 1024
+
+VIDEO_FILTER = "Videos (*.mp4 *.avi *.mkv *.mov *.webm *.m4v);;All Files (*)"
+
+
+class EdgePreview:
+    """Downscaled grayscale input of a Canny step, converted once and
+    reused for every threshold while a slider is dragged"""
+    
+    def __init__(self, key, image, max_pixels=PREVIEW_PIXELS):
+        self.key = key
+        h, w = image.shape[:2]
+        scale = math.sqrt(max_pixels / (h * w))
+        if scale < 1:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        if len(image.shape) == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        self.gray = image
+    
+    def render(self, low, high, later_steps=()):
+        """Edges of the proxy with the steps after the Canny step applied"""
+        return run_steps(detect_edges(self.gray, low, high), later_steps)
+
+
+def compute_histograms(image, max_pixels=None, cancelled=None):
+    """Per-channel 256-bin histograms, as a (channels, 256) array.
+    
+    With max_pixels the image is sampled on a regular grid of about that
+    many pixels. Returns None if cancelled() reported True.
+    """
+    if max_pixels is not None:
+        step = max(1, int(math.sqrt(image.shape[0] * image.shape[1] / max_pixels)))
+        image = np.ascontiguousarray(image[::step, ::step])
+    channels = image.shape[2] if len(image.shape) == 3 else 1
+    hists = []
+    for channel in range(channels):
+        if cancelled is not None and cancelled():
+            return None
+        hists.append(cv2.calcHist([image], [channel], None, [256], [0, 256]).ravel())
+    return np.array(hists, dtype=np.int64)
+
+
+def histogram_statistics(hist):
+    """Min, max, mean and percentage of clipped (0 or 255) values of one channel"""
+    total = hist.sum()
+    if total == 0:
+        return 0, 0, 0.0, 0.0
+    present = np.flatnonzero(hist)
+    mean = float(np.dot(hist, np.arange(256))) / total
+    clipped = 100.0 * (hist[0] + hist[255]) / total
+    return int(present[0]), int(present[-1]), mean, clipped
+
+
+class StageCache:
+    """LRU cache of stage outputs keyed by source and pipeline prefix, bounded in bytes.
+    
+    Worker threads share it, so every access holds a lock.
+    """
+    
+    def __init__(self, max_bytes=STAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, key):
+        with self.lock:
+            image = self.entries.get(key)
+            if image is not None:
+                self.entries.move_to_end(key)
+            return image
+    
+    def put(self, key, image):
+        with self.lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key).nbytes
+            if image.nbytes > self.max_bytes:
+                return
+            self.entries[key] = image
+            self.total_bytes += image.nbytes
+            while self.total_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+
+class Pipeline:
+    """Ordered operations applied to a source image, with undo history.
+    
+    Stage outputs are cached under the tuple of steps that produced them,
+    so changing step k reuses stages before k, and undo/redo to a state
+    whose stages are still cached costs nothing. The key also holds the
+    generation of the source image, so a worker still running on an old
+    image can't put its stages where the new image would find them.
+    """
+    
+    # Shared by all pipelines, so no two sources ever get the same generation
+    source_generations = itertools.count()
+    
+    def __init__(self, source, cache):
+        self.cache = cache
+        self.source = source
+        self.history = [()]
+        self.history_index = 0
+    
+    @property
+    def source(self):
+        return self.current_source[1]
+    
+    @source.setter
+    def source(self, image):
+        # One attribute, so worker threads read a matching pair
+        self.current_source = (next(self.source_generations), image)
+    
+    @property
+    def source_generation(self):
+        return self.current_source[0]
+    
+    @property
+    def steps(self):
+        return self.history[self.history_index]
+    
+    def edit(self, steps):
+        # A new edit discards anything that could have been redone
+        del self.history[self.history_index + 1:]
+        self.history.append(tuple(steps))
+        self.history_index += 1
+    
+    def add_step(self, step):
+        self.edit(self.steps + (step,))
+    
+    def remove_step(self, index):
+        self.edit(self.steps[:index] + self.steps[index + 1:])
+    
+    def replace_step(self, index, step):
+        self.edit(self.steps[:index] + (step,) + self.steps[index + 1:])
+    
+    def can_undo(self):
+        return self.history_index > 0
+    
+    def can_redo(self):
+        return self.history_index < len(self.history) - 1
+    
+    def undo(self):
+        if self.can_undo():
+            self.history_index -= 1
+    
+    def redo(self):
+        if self.can_redo():
+            self.history_index += 1
+    
+    def output(self, steps=None, cancelled=None):
+        """Run steps (the current ones by default) over the source image.
+        
+        If given, cancelled() is polled between stages and None is
+        returned as soon as it reports True.
+        """
+        if steps is None:
+            steps = self.steps
+        generation, image = self.current_source
+        # Start from the longest prefix whose output is still cached
+        start = 0
+        for end in range(len(steps), 0, -1):
+            cached = self.cache.get((generation, steps[:end]))
+            if cached is not None:
+                start, image = end, cached
+                break
+        
+        for end in range(start + 1, len(steps) + 1):
+            if cancelled is not None and cancelled():
+                return None
+            name, params = steps[end - 1]
+            image = OPERATIONS[name][0](image, **dict(params))
+            self.cache.put((generation, steps[:end]), image)
+        return image
+
+
+class WorkerSignals(QObject):
+    """Signals emitted by Worker from the thread pool"""
+    finished = pyqtSignal(int, object)  # request id, result
+    failed = pyqtSignal(int, str)  # request id, error message
+
+
+class Worker(QRunnable):
+    """Runs func(is_cancelled) on a pool thread and reports the result"""
+    
+    def __init__(self, request_id, func, is_cancelled):
+        super().__init__()
+        self.signals = WorkerSignals()
+        self.request_id = request_id
+        self.func = func
+        self.is_cancelled = is_cancelled
+    
+    def run(self):
+        try:
+            result = self.func(self.is_cancelled)
+        except Exception as e:
+            self.signals.failed.emit(self.request_id, str(e))
+            return
+        self.signals.finished.emit(self.request_id, result)
+
+
+def render_tile(tiled, steps, level, tx, ty):
+    """Read one tile and run the pipeline steps over it; runs on a worker"""
+    tile, crop = tiled.read_tile(level, tx, ty, TILE_HALO if steps else 0)
+    tile = np.ascontiguousarray(run_steps(tile, steps)[crop])
+    h, w = tile.shape[:2]
+    # Copy so the QImage owns its pixels once the array goes away
+    return QImage(tile.data, w, h, tile.strides[0], QImage.Format.Format_BGR888).copy()
+
+
+class TiledImageView(QWidget):
+    """Zoomable view of a huge image that only renders the visible tiles.
+    
+    Tiles are decoded on a thread pool into an LRU cache keyed by
+    (steps, level, x, y). Until a tile arrives, the matching part of a
+    coarser cached level is drawn in its place.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.setMinimumSize(200, 200)
+        self.tiled = None
+        self.steps = ()
+        self.cache = tiled_image.TileCache(MAX_TILES)
+        self.thread_pool = QThreadPool()
+        self.pending = set()
+        self.wanted = set()
+        self.generation = 0
+        
+        # Screen pixels per image pixel and pan from the centred position
+        self.zoom = 1.0
+        self.pan = QPointF(0, 0)
+        self.drag_start = None
+    
+    def set_image(self, tiled):
+        self.generation += 1
+        self.tiled = tiled
+        self.cache.clear()
+        self.pending.clear()
+        self.fit_to_window()
+    
+    def set_steps(self, steps):
+        # Tiles of other steps stay cached, so undo redraws instantly
+        self.steps = steps
+        self.update()
+    
+    def fit_to_window(self):
+        if self.tiled is None:
+            return
+        self.zoom = min(1.0, self.width() / self.tiled.width,
+                        self.height() / self.tiled.height)
+        self.pan = QPointF(0, 0)
+        self.update()
+    
+    def image_origin(self):
+        x = (self.width() - self.tiled.width * self.zoom) / 2 + self.pan.x()
+        y = (self.height() - self.tiled.height * self.zoom) / 2 + self.pan.y()
+        return QPointF(x, y)
+    
+    def tile_rect(self, level, tx, ty):
+        """Screen rectangle of a tile, clipped to the image edge"""
+        origin = self.image_origin()
+        size = (TILE_SIZE << level) * self.zoom
+        x, y = origin.x() + tx * size, origin.y() + ty * size
+        width = min(size, origin.x() + self.tiled.width * self.zoom - x)
+        height = min(size, origin.y() + self.tiled.height * self.zoom - y)
+        return QRectF(x, y, width, height)
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), Qt.GlobalColor.darkGray)
+        if self.tiled is None:
+            return
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, self.zoom < 1)
+        
+        # Pick the level whose pixels are closest to screen pixels
+        level = min(self.tiled.max_level,
+                    max(0, int(math.floor(math.log2(1 / self.zoom)))))
+        origin = self.image_origin()
+        size = (TILE_SIZE << level) * self.zoom
+        columns, rows = self.tiled.tile_grid(level)
+        first_x = max(0, int(-origin.x() // size))
+        last_x = min(columns - 1, int((self.width() - origin.x()) // size))
+        first_y = max(0, int(-origin.y() // size))
+        last_y = min(rows - 1, int((self.height() - origin.y()) // size))
+        
+        # The single coarsest tile is always wanted as a placeholder
+        wanted = {(self.steps, self.tiled.max_level, 0, 0)}
+        for ty in range(first_y, last_y + 1):
+            for tx in range(first_x, last_x + 1):
+                key = (self.steps, level, tx, ty)
+                wanted.add(key)
+                tile = self.cache.get(key)
+                if tile is not None:
+                    painter.drawImage(self.tile_rect(level, tx, ty), tile)
+                else:
+                    self.draw_placeholder(painter, level, tx, ty)
+        
+        # Queued tiles that scrolled out of view are skipped by the workers
+        self.wanted = wanted
+        for key in wanted:
+            if key not in self.pending and self.cache.get(key) is None:
+                self.request_tile(key)
+    
+    def draw_placeholder(self, painter, level, tx, ty):
+        target = self.tile_rect(level, tx, ty)
+        for parent in range(level + 1, self.tiled.max_level + 1):
+            shift = parent - level
+            tile = self.cache.get((self.steps, parent, tx >> shift, ty >> shift))
+            if tile is None:
+                continue
+            # Part of the parent tile covering this tile, in parent pixels
+            scale = 1 / (1 << shift)
+            source = QRectF((tx * TILE_SIZE * scale) % TILE_SIZE,
+                            (ty * TILE_SIZE * scale) % TILE_SIZE,
+                            target.width() / self.zoom / (1 << parent),
+                            target.height() / self.zoom / (1 << parent))
+            painter.drawImage(target, tile, source)
+            return
+    
+    def request_tile(self, key):
+        steps, level, tx, ty = key
+        tiled, generation = self.tiled, self.generation
+        
+        def func(is_cancelled):
+            if is_cancelled():
+                return key, None
+            return key, render_tile(tiled, steps, level, tx, ty)
+        
+        worker = Worker(generation, func,
+                        lambda: generation != self.generation or key not in self.wanted)
+        worker.signals.finished.connect(self.on_tile_ready, Qt.ConnectionType.QueuedConnection)
+        worker.signals.failed.connect(lambda *args: self.pending.discard(key),
+                                      Qt.ConnectionType.QueuedConnection)
+        self.pending.add(key)
+        self.thread_pool.start(worker)
+    
+    def on_tile_ready(self, generation, result):
+        key, tile = result
+        if generation != self.generation:
+            return
+        self.pending.discard(key)
+        if tile is not None:
+            self.cache.put(key, tile)
+            self.update()
+    
+    def wheelEvent(self, event):
+        if self.tiled is None:
+            return
+        steps = event.angleDelta().y() / 120
+        min_zoom = 0.5 * min(self.width() / self.tiled.width, self.height() / self.tiled.height)
+        zoom = min(16.0, max(min_zoom, self.zoom * 1.25 ** steps))
+        
+        # Keep the image point under the cursor in place
+        cursor = event.position()
+        origin = self.image_origin()
+        x = cursor.x() - (cursor.x() - origin.x()) * zoom / self.zoom
+        y = cursor.y() - (cursor.y() - origin.y()) * zoom / self.zoom
+        self.zoom = zoom
+        self.pan = QPointF(x - (self.width() - self.tiled.width * zoom) / 2,
+                           y - (self.height() - self.tiled.height * zoom) / 2)
+        self.update()
+    
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.drag_start = event.position()
+            self.setCursor(Qt.CursorShape.ClosedHandCursor)
+    
+    def mouseMoveEvent(self, event):
+        if self.drag_start is not None:
+            self.pan += event.position() - self.drag_start
+            self.drag_start = event.position()
+            self.update()
+    
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.drag_start = None
+            self.unsetCursor()
+    
+    def mouseDoubleClickEvent(self, event):
+        self.fit_to_window()
+
+
+class HistogramWidget(QWidget):
+    """Draws per-channel histograms as overlaid curves"""
+    
+    # Curve colours for B, G, R channels; single-channel images use gray
+    CHANNEL_COLOURS = (QColor(60, 120, 255), QColor(40, 200, 40), QColor(240, 50, 50))
+    
+    def __init__(self):
+        super().__init__()
+        self.setMinimumSize(256, 120)
+        self.hists = None
+    
+    def set_histograms(self, hists):
+        self.hists = hists
+        self.update()
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(30, 30, 30))
+        if self.hists is None:
+            return
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        
+        # Scale to the tallest interior bin so clipped spikes at 0 and 255
+        # don't flatten the rest of the curve
+        peak = max(1, int(self.hists[:, 1:255].max()))
+        width, height = self.width(), self.height()
+        for channel, hist in enumerate(self.hists):
+            colour = (QColor(200, 200, 200) if len(self.hists) == 1
+                      else self.CHANNEL_COLOURS[channel % 3])
+            heights = np.minimum(hist / peak, 1.0) * (height - 2)
+            path = QPainterPath()
+            path.moveTo(0, height)
+            for value, bar in enumerate(heights):
+                path.lineTo(value * width / 255, height - 1 - bar)
+            path.lineTo(width, height)
+            painter.setPen(QPen(colour, 1))
+            fill = QColor(colour)
+            fill.setAlpha(60)
+            painter.setBrush(fill)
+            painter.drawPath(path)
+
 
 class OpenCVImageViewer(QMainWindow):
     def __init__(self):
         super().__init__()
         self.init_ui()
         self.current_image = None
+        self.pipeline = None
+        self.stage_cache = StageCache()
+        
+        # Loading and processing run on worker threads; each request gets
+        # an id and any older request still running is superseded
+        self.thread_pool = QThreadPool()
+        self.request_id = 0
+        
+        # Video playback: the decoder thread, the frame shown last and the
+        # counters behind the statistics label
+        self.decoder = None
+        self.video_frame = None
+        self.play_start = 0.0
+        self.pause_start = None
+        self.reset_video_stats()
+        
+        # Background statistics requests are superseded like pipeline ones
+        self.stats_id = 0
 
     def init_ui(self):
         # Set window properties
@@ -31,6 +524,21 @@ class OpenCVImageViewer(QMainWindow):
         self.open_button.clicked.connect(self.open_image)
         toolbar.addWidget(self.open_button)
         
+        # Video file and live stream buttons
+        self.video_button = QPushButton("Open Video")
+        self.video_button.clicked.connect(self.open_video)
+        toolbar.addWidget(self.video_button)
+        
+        self.stream_button = QPushButton("Open Stream")
+        self.stream_button.clicked.connect(self.open_stream)
+        toolbar.addWidget(self.stream_button)
+        
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.setCheckable(True)
+        self.pause_button.setEnabled(False)
+        self.pause_button.toggled.connect(self.toggle_pause)
+        toolbar.addWidget(self.pause_button)
+        
         # Grayscale conversion button
         self.gray_button = QPushButton("Convert to Grayscale")
         self.gray_button.clicked.connect(self.convert_to_gray)
@@ -46,103 +554,631 @@ class OpenCVImageViewer(QMainWindow):
         self.reset_button.clicked.connect(self.reset_image)
         toolbar.addWidget(self.reset_button)
         
+        # Undo and redo buttons
+        self.undo_button = QPushButton("Undo")
+        self.undo_button.setShortcut(QKeySequence.StandardKey.Undo)
+        self.undo_button.clicked.connect(self.undo)
+        toolbar.addWidget(self.undo_button)
+        
+        self.redo_button = QPushButton("Redo")
+        self.redo_button.setShortcut(QKeySequence.StandardKey.Redo)
+        self.redo_button.clicked.connect(self.redo)
+        toolbar.addWidget(self.redo_button)
+        
         # Add toolbar to main layout
         layout.addLayout(toolbar)
         
-        # Create image display area
+        content = QHBoxLayout()
+        layout.addLayout(content)
+        
+        # Create image display area; huge images use the tiled view instead
+        self.image_stack = QStackedWidget()
         self.image_label = QLabel()
         self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.image_label.setText("Open an image to get started")
-        layout.addWidget(self.image_label)
+        self.image_stack.addWidget(self.image_label)
+        self.tiled_view = TiledImageView()
+        self.image_stack.addWidget(self.tiled_view)
+        content.addWidget(self.image_stack, 1)
+        
+        # Pipeline panel listing the operations applied to the original
+        panel = QVBoxLayout()
+        panel.addWidget(QLabel("Pipeline"))
+        self.steps_list = QListWidget()
+        self.steps_list.setMaximumWidth(220)
+        self.steps_list.itemDoubleClicked.connect(self.edit_step)
+        panel.addWidget(self.steps_list)
+        
+        self.edit_step_button = QPushButton("Edit Step")
+        self.edit_step_button.clicked.connect(self.edit_step)
+        panel.addWidget(self.edit_step_button)
+        
+        self.remove_step_button = QPushButton("Remove Step")
+        self.remove_step_button.clicked.connect(self.remove_step)
+        panel.addWidget(self.remove_step_button)
+        
+        # Threshold sliders for the selected (or last) Canny step
+        self.low_label = QLabel()
+        self.low_slider = self.make_threshold_slider()
+        panel.addWidget(self.low_label)
+        panel.addWidget(self.low_slider)
+        self.high_label = QLabel()
+        self.high_slider = self.make_threshold_slider()
+        panel.addWidget(self.high_label)
+        panel.addWidget(self.high_slider)
+        self.steps_list.currentRowChanged.connect(self.sync_threshold_sliders)
+        self.edge_preview = None
+        content.addLayout(panel)
+        
+        # Dockable histogram and statistics panel for the current image
+        stats_widget = QWidget()
+        stats_layout = QVBoxLayout(stats_widget)
+        self.histogram_widget = HistogramWidget()
+        stats_layout.addWidget(self.histogram_widget, 1)
+        self.stats_label = QLabel("No image")
+        self.stats_label.setTextFormat(Qt.TextFormat.PlainText)
+        self.stats_label.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        stats_layout.addWidget(self.stats_label)
+        self.stats_dock = QDockWidget("Histogram", self)
+        self.stats_dock.setWidget(stats_widget)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.stats_dock)
+        
+        # Busy indicator shown while a worker is running
+        self.busy_bar = QProgressBar()
+        self.busy_bar.setRange(0, 0)
+        self.busy_bar.setMaximumWidth(150)
+        self.busy_bar.hide()
+        self.statusBar().addPermanentWidget(self.busy_bar)
+        
+        # Playback rates, dropped frames and per-stage latency
+        self.video_stats_label = QLabel()
+        self.video_stats_label.hide()
+        self.statusBar().addPermanentWidget(self.video_stats_label)
         
         # Store the original image
         self.original_image = None
+        
+        # QImage wrapping the displayed array and its scaled pixmaps
+        self.display_array = None
+        self.display_image = None
+        self.scaled_pixmaps = {}
+        
+        # Resize events are coalesced into one rescale
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(RESIZE_DELAY_MS)
+        self.resize_timer.timeout.connect(self.update_scaled_pixmap)
+        
+        # Shows the next due video frame; frames that fell behind the
+        # playback clock are dropped rather than shown late
+        self.playback_timer = QTimer(self)
+        self.playback_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.playback_timer.setInterval(VIDEO_TICK_MS)
+        self.playback_timer.timeout.connect(self.show_next_frame)
 
     def open_image(self):
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "Open Image", "", "Image Files (*.png *.jpg *.jpeg *.bmp *.tif *.tiff)"
+            self, "Open Image", "",
+            "Image Files (*.png *.jpg *.jpeg *.bmp *.tif *.tiff);;"
+            "Memory-mapped Images (*.npy *.raw)"
         )
         
         if file_path:
+            if self.open_tiled(file_path):
+                return
+            self.start_worker(f"Loading {file_path}...",
+                              lambda is_cancelled: load_image(file_path),
+                              self.on_image_loaded, "Could not open image")
+
+    def open_tiled(self, file_path):
+        """Open raw, .npy and very large BMP files in the tiled viewing mode.
+        
+        Returns False if the file should be decoded normally instead.
+        """
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in tiled_image.MAPPED_EXTENSIONS + (".bmp",):
+            return False
+        
+        raw_shape = None
+        if extension == ".raw":
+            text, ok = QInputDialog.getText(
+                self, "Raw Image", "Width x height x channels (1 or 3):", text="40000x30000x3")
+            if not ok:
+                return True
             try:
-                # Load image with OpenCV
-                self.original_image = cv2.imread(file_path)
-                if self.original_image is None:
-                    raise ValueError("Failed to load image")
-                
-                # Make a copy for current display
-                self.current_image = self.original_image.copy()
-                
-                # Display the image
-                self.display_cv_image(self.current_image)
-                
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Could not open image: {str(e)}")
+                raw_shape = tuple(int(value) for value in text.lower().split("x"))
+            except ValueError:
+                QMessageBox.critical(self, "Error", f"Invalid size: {text}")
+                return True
+            if len(raw_shape) != 3 or raw_shape[2] not in tiled_image.SUPPORTED_CHANNELS:
+                QMessageBox.critical(self, "Error", f"Expected width x height x 1 or 3: {text}")
+                return True
+        
+        try:
+            tiled = tiled_image.TiledImage(
+                lambda: tiled_image.open_mapped(file_path, raw_shape))
+        except (OSError, ValueError, TypeError) as e:
+            if extension == ".bmp":
+                # Compressed or unusual BMPs still load through OpenCV
+                return False
+            QMessageBox.critical(self, "Error", f"Could not open image: {str(e)}")
+            return True
+        if extension == ".bmp" and tiled.width * tiled.height < TILED_MIN_PIXELS:
+            return False
+        
+        self.stop_video()
+        self.update_statistics(None)
+        # Supersede any load in flight; the whole image is never in memory
+        self.request_id += 1
+        self.busy_bar.hide()
+        self.original_image = None
+        self.current_image = None
+        self.display_image = None
+        self.pipeline = Pipeline(None, self.stage_cache)
+        self.image_stack.setCurrentWidget(self.tiled_view)
+        self.tiled_view.set_image(tiled)
+        self.update_pipeline()
+        self.statusBar().showMessage(
+            f"Tiled view of {file_path} ({tiled.width}x{tiled.height})")
+        return True
 
-    def convert_to_gray(self):
-        if self.current_image is not None:
-            # Convert the image to grayscale
-            self.current_image = cv2.cvtColor(self.current_image, cv2.COLOR_BGR2GRAY)
+    def on_image_loaded(self, request_id, image):
+        if request_id != self.request_id:
+            return
+        self.stop_video()
+        self.image_stack.setCurrentWidget(self.image_label)
+        self.tiled_view.set_image(None)
+        self.original_image = image
+        
+        # Operations are applied non-destructively on top of it
+        self.stage_cache.clear()
+        self.pipeline = Pipeline(self.original_image, self.stage_cache)
+        self.update_pipeline()
+
+    def open_video(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open Video", "", VIDEO_FILTER)
+        if file_path:
+            self.start_video(file_path)
+
+    def open_stream(self):
+        text, ok = QInputDialog.getText(
+            self, "Open Stream", "Stream URL or camera index:", text="0")
+        if ok and text.strip():
+            text = text.strip()
+            self.start_video(int(text) if text.isdigit() else text)
+
+    def start_video(self, source):
+        """Play a video file or stream with the pipeline applied live"""
+        self.stop_video()
+        try:
+            decoder = video.VideoDecoder(source, run_steps, capacity=VIDEO_BUFFER_FRAMES)
+        except ValueError as e:
+            QMessageBox.critical(self, "Error", f"Could not open video: {str(e)}")
+            return
+        
+        # Supersede any load in flight and keep the steps of the last image
+        self.request_id += 1
+        self.busy_bar.hide()
+        steps = self.pipeline.steps if self.pipeline is not None else ()
+        self.original_image = None
+        self.current_image = None
+        self.stage_cache.clear()
+        self.pipeline = Pipeline(None, self.stage_cache)
+        if steps:
+            self.pipeline.edit(steps)
+        self.image_stack.setCurrentWidget(self.image_label)
+        self.tiled_view.set_image(None)
+        
+        self.decoder = decoder
+        self.decoder.steps = self.pipeline.steps
+        self.decoder.start()
+        self.reset_video_stats()
+        self.play_start = time.perf_counter()
+        self.pause_start = None
+        self.pause_button.setEnabled(True)
+        self.video_stats_label.show()
+        self.playback_timer.start()
+        self.update_pipeline()
+        self.statusBar().showMessage(f"Playing {source}")
+
+    def stop_video(self):
+        if self.decoder is None:
+            return
+        self.playback_timer.stop()
+        self.decoder.stop()
+        self.decoder = None
+        self.video_frame = None
+        self.pause_button.blockSignals(True)
+        self.pause_button.setChecked(False)
+        self.pause_button.blockSignals(False)
+        self.pause_button.setText("Pause")
+        self.pause_button.setEnabled(False)
+        self.video_stats_label.hide()
+
+    def toggle_pause(self, paused):
+        if self.decoder is None:
+            return
+        if paused:
+            self.playback_timer.stop()
+            self.pause_start = time.perf_counter()
+            self.pause_button.setText("Resume")
+            # Edits made while paused re-run on the frame being shown
+            if self.video_frame is not None:
+                self.stage_cache.clear()
+                self.pipeline.source = self.video_frame.source
+        else:
+            # Move the clock on by the pause so no frames count as late
+            self.request_id += 1
+            self.play_start += time.perf_counter() - self.pause_start
+            self.pause_start = None
+            self.pause_button.setText("Pause")
+            self.playback_timer.start()
+
+    def show_next_frame(self):
+        """Display the newest frame that is due, dropping any older ones"""
+        decoder = self.decoder
+        if decoder.is_stream:
+            # Live sources are shown as soon as they arrive
+            now = math.inf
+        else:
+            now = time.perf_counter() - self.play_start
+        frame, skipped = decoder.buffer.take_due(now)
+        self.frames_skipped += skipped
+        
+        if frame is not None:
+            start = time.perf_counter()
+            image = frame.image
+            process_ms = frame.process_ms
+            if frame.steps != decoder.steps:
+                # Buffered before the last edit, so redo it with the new steps
+                image = run_steps(frame.source, decoder.steps)
+                process_ms += (time.perf_counter() - start) * 1000
+            self.video_frame = frame
+            self.current_image = image
+            shown = time.perf_counter()
+            self.display_cv_image(image)
+            done = time.perf_counter()
             
-            # Convert back to 3 channels for display consistency
-            if len(self.current_image.shape) == 2:
-                self.current_image = cv2.cvtColor(self.current_image, cv2.COLOR_GRAY2BGR)
-                
-            self.display_cv_image(self.current_image)
+            self.displayed.tick()
+            self.stage_totals[0] += frame.decode_ms
+            self.stage_totals[1] += process_ms
+            self.stage_totals[2] += (done - shown) * 1000
+            self.stage_totals[3] += (done - frame.ready_at) * 1000 + frame.decode_ms + frame.process_ms
+            self.stage_count += 1
+        elif decoder.finished and len(decoder.buffer) == 0:
+            self.playback_timer.stop()
+            self.pause_button.setEnabled(False)
+            if self.video_frame is not None:
+                # The last frame stays editable like a still image
+                self.stage_cache.clear()
+                self.pipeline.source = self.video_frame.source
+            self.update_video_stats()
+            self.statusBar().showMessage("Playback finished")
+            return
+        
+        if time.perf_counter() - self.stats_updated >= VIDEO_STATS_MS / 1000:
+            self.update_video_stats()
+
+    def reset_video_stats(self):
+        self.displayed = video.RateMeter()
+        self.frames_skipped = 0
+        self.stage_totals = [0.0, 0.0, 0.0, 0.0]  # decode, process, display, latency
+        self.stage_count = 0
+        self.stats_updated = time.perf_counter()
+
+    def update_video_stats(self):
+        decoder = self.decoder
+        if decoder is None:
+            return
+        dropped = self.frames_skipped + decoder.buffer.overwritten
+        text = (f"Decoded {decoder.decoded.rate():.1f} fps | "
+                f"Displayed {self.displayed.rate():.1f} fps | Dropped {dropped}")
+        if self.stage_count:
+            decode_ms, process_ms, display_ms, latency_ms = (
+                total / self.stage_count for total in self.stage_totals)
+            text += (f" | Decode {decode_ms:.1f} ms, Process {process_ms:.1f} ms, "
+                     f"Display {display_ms:.1f} ms, Latency {latency_ms:.0f} ms")
+        self.video_stats_label.setText(text)
+        # A sampled histogram is plenty for frames that are replaced anyway
+        self.update_statistics(self.current_image, refine=False)
+        
+        # Latencies are averaged over each refresh interval
+        self.stage_totals = [0.0, 0.0, 0.0, 0.0]
+        self.stage_count = 0
+        self.stats_updated = time.perf_counter()
+
+    def convert_to_gray(self):
+        if self.pipeline is not None:
+            self.pipeline.add_step(make_step("Grayscale"))
+            self.update_pipeline()
 
     def detect_edges(self):
-        if self.current_image is not None:
-            # Convert to grayscale if not already
-            if len(self.current_image.shape) == 3:
-                gray = cv2.cvtColor(self.current_image, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = self.current_image.copy()
-            
-            # Apply Canny edge detector
-            edges = cv2.Canny(gray, 50, 150)
-            
-            # Convert back to BGR for display
-            self.current_image = cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
-            self.display_cv_image(self.current_image)
+        if self.pipeline is not None:
+            self.pipeline.add_step(make_step("Canny"))
+            self.update_pipeline()
 
     def reset_image(self):
-        if self.original_image is not None:
-            self.current_image = self.original_image.copy()
-            self.display_cv_image(self.current_image)
+        if self.pipeline is not None and self.pipeline.steps:
+            # Clearing the pipeline is itself undoable
+            self.pipeline.edit(())
+            self.update_pipeline()
+
+    def undo(self):
+        if self.pipeline is not None and self.pipeline.can_undo():
+            self.pipeline.undo()
+            self.update_pipeline()
+
+    def redo(self):
+        if self.pipeline is not None and self.pipeline.can_redo():
+            self.pipeline.redo()
+            self.update_pipeline()
+
+    def remove_step(self):
+        row = self.steps_list.currentRow()
+        if self.pipeline is not None and row >= 0:
+            self.pipeline.remove_step(row)
+            self.update_pipeline()
+
+    def edit_step(self):
+        row = self.steps_list.currentRow()
+        if self.pipeline is None or row < 0:
+            return
+        name, params = self.pipeline.steps[row]
+        if not params:
+            return
+        
+        text, ok = QInputDialog.getText(
+            self, f"Edit {name}", "Parameters:",
+            text=", ".join(f"{key}={value}" for key, value in params))
+        if not ok:
+            return
+        try:
+            values = dict(params)
+            for item in filter(None, (part.strip() for part in text.split(","))):
+                key, value = (part.strip() for part in item.split("="))
+                if key not in values:
+                    raise ValueError(f"Unknown parameter '{key}'")
+                values[key] = type(values[key])(value)
+        except ValueError as e:
+            QMessageBox.warning(self, "Error", f"Invalid parameters: {str(e)}")
+            return
+        self.pipeline.replace_step(row, make_step(name, **values))
+        self.update_pipeline()
+
+    def make_threshold_slider(self):
+        slider = QSlider(Qt.Orientation.Horizontal)
+        slider.setRange(0, MAX_THRESHOLD)
+        slider.setMaximumWidth(220)
+        slider.setEnabled(False)
+        slider.valueChanged.connect(self.on_threshold_changed)
+        slider.sliderReleased.connect(self.apply_thresholds)
+        return slider
+
+    def canny_index(self):
+        """Index of the step the threshold sliders edit, or -1"""
+        if self.pipeline is None:
+            return -1
+        steps = self.pipeline.steps
+        row = self.steps_list.currentRow()
+        if 0 <= row < len(steps) and steps[row][0] == "Canny":
+            return row
+        for index in range(len(steps) - 1, -1, -1):
+            if steps[index][0] == "Canny":
+                return index
+        return -1
+
+    def sync_threshold_sliders(self):
+        index = self.canny_index()
+        if index >= 0:
+            params = dict(self.pipeline.steps[index][1])
+            low, high = params["low"], params["high"]
+        else:
+            low, high = OPERATIONS["Canny"][1]["low"], OPERATIONS["Canny"][1]["high"]
+        for slider, value in ((self.low_slider, low), (self.high_slider, high)):
+            slider.blockSignals(True)
+            slider.setValue(value)
+            slider.blockSignals(False)
+            slider.setEnabled(index >= 0)
+        self.low_label.setText(f"Canny low: {low}")
+        self.high_label.setText(f"Canny high: {high}")
+
+    def on_threshold_changed(self, value):
+        low, high = self.low_slider.value(), self.high_slider.value()
+        self.low_label.setText(f"Canny low: {low}")
+        self.high_label.setText(f"Canny high: {high}")
+        if self.low_slider.isSliderDown() or self.high_slider.isSliderDown():
+            self.preview_thresholds(low, high)
+        else:
+            # Keyboard and wheel changes have no release, so apply them now
+            self.apply_thresholds()
+
+    def preview_thresholds(self, low, high):
+        """Show the thresholds on a proxy without touching the pipeline"""
+        index = self.canny_index()
+        if index < 0:
+            return
+        steps = self.pipeline.steps
+        preview_steps = steps[:index] + (make_step("Canny", low=low, high=high),) + steps[index + 1:]
+        
+        if self.decoder is not None and self.playback_timer.isActive():
+            # Playing video picks the thresholds up frame by frame
+            self.decoder.steps = preview_steps
+            return
+        if self.pipeline.source is None:
+            # Tiles are re-rendered once the slider is released
+            return
+        
+        # The stage before the Canny step is normally cached already
+        key = (self.pipeline.source_generation, steps[:index])
+        if self.edge_preview is None or self.edge_preview.key != key:
+            self.edge_preview = EdgePreview(key, self.pipeline.output(steps[:index]))
+        
+        # Supersede any full-resolution result still being computed
+        self.request_id += 1
+        self.busy_bar.hide()
+        self.display_cv_image(self.edge_preview.render(low, high, steps[index + 1:]))
+
+    def apply_thresholds(self):
+        index = self.canny_index()
+        if index < 0:
+            return
+        step = make_step("Canny", low=self.low_slider.value(), high=self.high_slider.value())
+        if step != self.pipeline.steps[index]:
+            self.pipeline.replace_step(index, step)
+        # Computes the full-resolution edges, or restores them if unchanged
+        self.update_pipeline()
+
+    def update_pipeline(self):
+        """Show the pipeline's steps and display its output"""
+        row = self.steps_list.currentRow()
+        self.steps_list.clear()
+        self.steps_list.addItems([describe_step(step) for step in self.pipeline.steps])
+        self.steps_list.setCurrentRow(min(row, self.steps_list.count() - 1))
+        self.undo_button.setEnabled(self.pipeline.can_undo())
+        self.redo_button.setEnabled(self.pipeline.can_redo())
+        self.sync_threshold_sliders()
+        
+        if self.image_stack.currentWidget() is self.tiled_view:
+            # Steps run per tile as tiles are rendered
+            self.tiled_view.set_steps(self.pipeline.steps)
+            return
+        
+        if self.decoder is not None:
+            # Frames decoded from now on use the new steps
+            self.decoder.steps = self.pipeline.steps
+            if self.playback_timer.isActive() or self.pipeline.source is None:
+                return
+        
+        pipeline, steps = self.pipeline, self.pipeline.steps
+        self.start_worker("Processing...",
+                          lambda is_cancelled: pipeline.output(steps, is_cancelled),
+                          self.on_pipeline_done, "Processing failed")
+
+    def on_pipeline_done(self, request_id, image):
+        if request_id != self.request_id or image is None:
+            return
+        self.current_image = image
+        self.display_cv_image(self.current_image)
+        self.update_statistics(self.current_image)
+
+    def update_statistics(self, image, refine=True):
+        """Show statistics of a sample at once, then exact ones from a worker"""
+        self.stats_id += 1
+        if image is None:
+            self.histogram_widget.set_histograms(None)
+            self.stats_label.setText("No image")
+            return
+        if image.shape[0] * image.shape[1] <= HISTOGRAM_SAMPLE_PIXELS:
+            state = "Exact"
+        else:
+            state = "Sampled, refining..." if refine else "Sampled"
+        self.show_statistics(self.stats_id,
+                             (compute_histograms(image, HISTOGRAM_SAMPLE_PIXELS), state))
+        if state != "Sampled, refining...":
+            return
+        
+        stats_id = self.stats_id
+        worker = Worker(stats_id,
+                        lambda is_cancelled: (compute_histograms(image, cancelled=is_cancelled),
+                                              "Exact"),
+                        lambda: stats_id != self.stats_id)
+        worker.signals.finished.connect(self.show_statistics, Qt.ConnectionType.QueuedConnection)
+        self.thread_pool.start(worker)
+
+    def show_statistics(self, stats_id, result):
+        hists, state = result
+        if stats_id != self.stats_id or hists is None:
+            return
+        self.histogram_widget.set_histograms(hists)
+        names = ("Gray",) if len(hists) == 1 else ("Blue", "Green", "Red")
+        lines = [f"{'':<6}{'min':>5}{'max':>5}{'mean':>8}{'clipped':>9}"]
+        for name, hist in zip(names, hists):
+            low, high, mean, clipped = histogram_statistics(hist)
+            lines.append(f"{name:<6}{low:>5}{high:>5}{mean:>8.1f}{clipped:>8.2f}%")
+        lines.append(state)
+        self.stats_label.setText("\n".join(lines))
+
+    def start_worker(self, message, func, on_finished, error_title):
+        """Run func on the thread pool, superseding any running request"""
+        self.request_id += 1
+        request_id = self.request_id
+        worker = Worker(request_id, func, lambda: request_id != self.request_id)
+        
+        # Results come back to the GUI thread through queued signals
+        worker.signals.finished.connect(on_finished, Qt.ConnectionType.QueuedConnection)
+        worker.signals.finished.connect(self.on_worker_done, Qt.ConnectionType.QueuedConnection)
+        worker.signals.failed.connect(
+            lambda failed_id, error: self.on_worker_failed(failed_id, error_title, error),
+            Qt.ConnectionType.QueuedConnection)
+        
+        self.statusBar().showMessage(message)
+        self.busy_bar.show()
+        self.thread_pool.start(worker)
+
+    def on_worker_done(self, request_id, result):
+        if request_id == self.request_id:
+            self.busy_bar.hide()
+            self.statusBar().clearMessage()
+
+    def on_worker_failed(self, request_id, title, error):
+        if request_id != self.request_id:
+            return
+        self.busy_bar.hide()
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Error", f"{title}: {error}")
 
     def display_cv_image(self, cv_img):
-        """Convert an OpenCV image to QPixmap and display it"""
+        """Wrap an OpenCV image in a QImage and display it"""
         if cv_img is None:
             return
         
-        # Convert BGR (OpenCV format) to RGB
+        # The QImage reads the array's buffer directly, so no colour
+        # conversion or copy is made; the array is kept alive alongside it
+        cv_img = np.ascontiguousarray(cv_img)
+        h, w = cv_img.shape[:2]
         if len(cv_img.shape) == 3:
-            rgb_image = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-            h, w, ch = rgb_image.shape
-            bytes_per_line = ch * w
-            
-            # Create QImage from the RGB data
-            q_img = QImage(rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
+            image_format = QImage.Format.Format_BGR888
         else:
             # Handle grayscale images
-            h, w = cv_img.shape
-            bytes_per_line = w
-            q_img = QImage(cv_img.data, w, h, bytes_per_line, QImage.Format.Format_Grayscale8)
+            image_format = QImage.Format.Format_Grayscale8
+        self.display_array = cv_img
+        self.display_image = QImage(cv_img.data, w, h, cv_img.strides[0], image_format)
         
-        # Create QPixmap from QImage and display it
-        pixmap = QPixmap.fromImage(q_img)
+        self.scaled_pixmaps.clear()
+        self.update_scaled_pixmap()
+
+    def update_scaled_pixmap(self):
+        """Show the displayed image scaled to the label, reusing earlier scales"""
+        if self.display_image is None:
+            return
         
-        # Resize pixmap to fit in the label while maintaining aspect ratio
-        pixmap = pixmap.scaled(self.image_label.width(), self.image_label.height(), 
-                              Qt.AspectRatioMode.KeepAspectRatio)
+        size = (self.image_label.width(), self.image_label.height())
+        pixmap = self.scaled_pixmaps.get(size)
+        if pixmap is None:
+            # Only the label-sized result is turned into a pixmap
+            scaled = self.display_image.scaled(size[0], size[1],
+                                               Qt.AspectRatioMode.KeepAspectRatio)
+            pixmap = QPixmap.fromImage(scaled)
+            if len(self.scaled_pixmaps) >= SCALED_CACHE_SIZE:
+                del self.scaled_pixmaps[next(iter(self.scaled_pixmaps))]
+            self.scaled_pixmaps[size] = pixmap
         
         self.image_label.setPixmap(pixmap)
 
+    def closeEvent(self, event):
+        # Supersede running work and let it stop before the window goes
+        self.request_id += 1
+        self.stop_video()
+        self.tiled_view.set_image(None)
+        self.thread_pool.waitForDone()
+        self.tiled_view.thread_pool.waitForDone()
+        event.accept()
+
     def resizeEvent(self, event):
         """Handle window resize events to resize the displayed image"""
         super().resizeEvent(event)
-        if self.current_image is not None:
-            self.display_cv_image(self.current_image)
+        # Restart the timer so a window drag rescales once it settles
+        self.resize_timer.start()
 
 def main():
     app = QApplication(sys.argv)
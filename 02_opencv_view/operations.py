@@ -0,0 +1,75 @@
+import cv2
+
+
+def convert_to_gray(image):
+    # Convert the image to grayscale
+    if len(image.shape) == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    
+    # Convert back to 3 channels for display consistency
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+
+def detect_edges(image, low=50, high=150):
+    # Convert to grayscale if not already
+    if len(image.shape) == 3:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    else:
+        gray = image
+    
+    # Apply Canny edge detector and convert back to BGR for display
+    edges = cv2.Canny(gray, low, high)
+    return cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
+
+
+# Operation name -> (function, default parameters)
+OPERATIONS = {
+    "Grayscale": (convert_to_gray, {}),
+    "Canny": (detect_edges, {"low": 50, "high": 150}),
+}
+
+
+def make_step(name, **params):
+    """A pipeline step as a hashable (name, sorted parameters) tuple"""
+    return (name, tuple(sorted({**OPERATIONS[name][1], **params}.items())))
+
+
+def describe_step(step):
+    name, params = step
+    if not params:
+        return name
+    return f"{name} ({', '.join(f'{key}={value}' for key, value in params)})"
+
+
+def parse_steps(text):
+    """Parse "Grayscale,Canny:low=30;high=90" into pipeline steps"""
+    steps = []
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, options = item.partition(":")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}'")
+        defaults = OPERATIONS[name][1]
+        params = {}
+        for option in filter(None, (part.strip() for part in options.split(";"))):
+            key, _, value = (part.strip() for part in option.partition("="))
+            if key not in defaults:
+                raise ValueError(f"Unknown parameter '{key}' for {name}")
+            params[key] = type(defaults[key])(value)
+        steps.append(make_step(name, **params))
+    return tuple(steps)
+
+
+def run_steps(image, steps):
+    """Apply pipeline steps to an image without caching the stages"""
+    for name, params in steps:
+        image = OPERATIONS[name][0](image, **dict(params))
+    return image
+
+
+def load_image(file_path):
+    # Load image with OpenCV
+    image = cv2.imread(file_path)
+    if image is None:
+        raise ValueError("Failed to load image")
+    return image
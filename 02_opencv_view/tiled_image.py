@@ -0,0 +1,143 @@
+import os
+import struct
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# Edge length of a tile in pixels of its pyramid level
+TILE_SIZE = 256
+
+# Extensions that are always memory-mapped rather than decoded
+MAPPED_EXTENSIONS = (".npy", ".raw")
+
+# Channel counts that can be shown: grayscale and BGR
+SUPPORTED_CHANNELS = (1, 3)
+
+
+def open_npy(path):
+    return np.load(path, mmap_mode="r")
+
+
+def open_raw(path, width, height, channels=3):
+    """Map headerless 8-bit interleaved pixels in OpenCV channel order"""
+    expected = width * height * channels
+    if os.path.getsize(path) < expected:
+        raise ValueError(f"File is smaller than {width}x{height}x{channels} bytes")
+    return np.memmap(path, dtype=np.uint8, mode="r", shape=(height, width, channels))
+
+
+def open_bmp(path):
+    """Map the pixels of an uncompressed 24 or 32-bit BMP file"""
+    with open(path, "rb") as f:
+        header = f.read(34)
+    if len(header) < 34 or header[:2] != b"BM":
+        raise ValueError("Not a BMP file")
+    offset = struct.unpack_from("<I", header, 10)[0]
+    width, height = struct.unpack_from("<ii", header, 18)
+    bits, compression = struct.unpack_from("<HI", header, 28)
+    # BI_BITFIELDS with 32 bits is plain BGRA in practice
+    if bits not in (24, 32) or compression not in (0, 3):
+        raise ValueError("Only uncompressed 24 and 32-bit BMP files can be mapped")
+
+    channels = bits // 8
+    row_bytes = (width * bits + 31) // 32 * 4
+    rows = np.memmap(path, dtype=np.uint8, mode="r", offset=offset,
+                     shape=(abs(height), row_bytes))
+    pixels = rows[:, :width * channels].reshape(abs(height), width, channels)[..., :3]
+    # Positive heights are stored bottom-up
+    return pixels[::-1] if height > 0 else pixels
+
+
+def open_mapped(path, raw_shape=None):
+    """Memory-map an image file; raw_shape is (width, height, channels)"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        return open_npy(path)
+    if extension == ".raw":
+        if raw_shape is None:
+            raise ValueError("Raw files need a width, height and channel count")
+        return open_raw(path, *raw_shape)
+    if extension == ".bmp":
+        return open_bmp(path)
+    raise ValueError(f"Cannot memory-map {extension} files")
+
+
+class TiledImage:
+    """Reads pyramid tiles from a memory-mapped image.
+
+    Level n is the image subsampled by 2**n. Tiles are read with strided
+    slicing, so only the rows and columns a tile actually samples are
+    touched and nothing outside the visible tiles is loaded. open_array()
+    is called again for every tile, so the pages a read touched are
+    unmapped afterwards and resident memory is bounded by the tile cache
+    rather than by how much of the file has been viewed.
+    """
+
+    def __init__(self, open_array):
+        array = open_array()
+        channels = array.shape[2] if array.ndim == 3 else 1
+        if (array.ndim not in (2, 3) or array.dtype != np.uint8
+                or channels not in SUPPORTED_CHANNELS):
+            raise ValueError("Only 8-bit grayscale or BGR images are supported")
+        self.open_array = open_array
+        self.height, self.width = array.shape[:2]
+        # The coarsest level fits in a single tile
+        self.max_level = 0
+        while max(self.width, self.height) > TILE_SIZE << self.max_level:
+            self.max_level += 1
+
+    def level_size(self, level):
+        step = 1 << level
+        return -(-self.width // step), -(-self.height // step)
+
+    def tile_grid(self, level):
+        width, height = self.level_size(level)
+        return -(-width // TILE_SIZE), -(-height // TILE_SIZE)
+
+    def read_tile(self, level, tx, ty, halo=0):
+        """Return a BGR tile extended by up to halo pixels on each side,
+        and the slices that crop the halo off again"""
+        step = 1 << level
+        width, height = self.level_size(level)
+        x0, y0 = tx * TILE_SIZE, ty * TILE_SIZE
+        x1, y1 = min(x0 + TILE_SIZE, width), min(y0 + TILE_SIZE, height)
+        left, top = min(halo, x0), min(halo, y0)
+        right, bottom = min(halo, width - x1), min(halo, height - y1)
+
+        array = self.open_array()
+        tile = array[(y0 - top) * step:(y1 + bottom) * step:step,
+                     (x0 - left) * step:(x1 + right) * step:step]
+        tile = np.ascontiguousarray(tile)
+        if tile.ndim == 2:
+            tile = tile[..., None]
+        if tile.shape[2] == 1:
+            tile = np.repeat(tile, 3, axis=2)
+        crop = (slice(top, top + y1 - y0), slice(left, left + x1 - x0))
+        return tile, crop
+
+
+class TileCache:
+    """Thread-safe LRU of rendered tiles keyed by (..., level, x, y)"""
+
+    def __init__(self, max_tiles=512):
+        self.max_tiles = max_tiles
+        self.tiles = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            tile = self.tiles.get(key)
+            if tile is not None:
+                self.tiles.move_to_end(key)
+            return tile
+
+    def put(self, key, tile):
+        with self.lock:
+            self.tiles[key] = tile
+            self.tiles.move_to_end(key)
+            while len(self.tiles) > self.max_tiles:
+                self.tiles.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.tiles.clear()
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import deque
+import cv2
+
+
+class VideoFrame:
+    """A decoded and processed frame with the timings measured for it"""
+
+    def __init__(self, pts, source, image, steps, decode_ms, process_ms, ready_at):
+        self.pts = pts  # presentation time in seconds from the first frame
+        self.source = source
+        self.image = image
+        self.steps = steps  # the steps image was processed with
+        self.decode_ms = decode_ms
+        self.process_ms = process_ms
+        self.ready_at = ready_at  # time.perf_counter() when it was buffered
+
+
+class FrameRingBuffer:
+    """Bounded frame queue between the decode thread and the display.
+
+    For files the decoder waits while the buffer is full. Live streams
+    cannot wait, so the oldest frame is overwritten instead.
+    """
+
+    def __init__(self, capacity=8, overwrite=False):
+        self.capacity = capacity
+        self.overwrite = overwrite
+        self.frames = deque()
+        self.overwritten = 0
+        self.condition = threading.Condition()
+
+    def put(self, frame, stopped):
+        """Add a frame; returns False if stopped was set while waiting"""
+        with self.condition:
+            while len(self.frames) >= self.capacity:
+                if self.overwrite:
+                    self.frames.popleft()
+                    self.overwritten += 1
+                    break
+                if stopped.is_set():
+                    return False
+                self.condition.wait()
+            self.frames.append(frame)
+            return True
+
+    def take_due(self, now):
+        """Return the newest frame due by now and how many older ones were skipped"""
+        with self.condition:
+            frame = None
+            skipped = -1
+            while self.frames and self.frames[0].pts <= now:
+                frame = self.frames.popleft()
+                skipped += 1
+            if frame is not None:
+                self.condition.notify_all()
+            return frame, max(0, skipped)
+
+    def __len__(self):
+        with self.condition:
+            return len(self.frames)
+
+    def wake(self):
+        with self.condition:
+            self.condition.notify_all()
+
+
+class RateMeter:
+    """Events per second over a sliding window"""
+
+    def __init__(self, window=1.0):
+        self.window = window
+        self.times = deque()
+
+    def tick(self):
+        now = time.perf_counter()
+        self.times.append(now)
+        while self.times and now - self.times[0] > self.window:
+            self.times.popleft()
+
+    def rate(self):
+        now = time.perf_counter()
+        while self.times and now - self.times[0] > self.window:
+            self.times.popleft()
+        return len(self.times) / self.window
+
+
+class VideoDecoder(threading.Thread):
+    """Decodes a cv2.VideoCapture source on its own thread, runs
+    process(frame, steps) on each frame and fills a FrameRingBuffer.
+
+    steps may be reassigned from another thread at any time; each frame
+    records the steps it was processed with.
+    """
+
+    def __init__(self, source, process, steps=(), capacity=8):
+        super().__init__(daemon=True)
+        self.capture = cv2.VideoCapture(source)
+        if not self.capture.isOpened():
+            raise ValueError(f"Could not open video source {source!r}")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 0.0
+        # Cameras and network streams have no frame count and cannot wait
+        self.is_stream = (not isinstance(source, str) or "://" in source
+                          or self.capture.get(cv2.CAP_PROP_FRAME_COUNT) <= 0)
+        self.process = process
+        self.steps = steps
+        self.buffer = FrameRingBuffer(capacity, overwrite=self.is_stream)
+        self.decoded = RateMeter()
+        self.stopped = threading.Event()
+        self.finished = False
+
+    def run(self):
+        start = time.perf_counter()
+        index = 0
+        while not self.stopped.is_set():
+            t0 = time.perf_counter()
+            ok, source = self.capture.read()
+            t1 = time.perf_counter()
+            if not ok:
+                break
+            steps = self.steps
+            image = self.process(source, steps)
+            t2 = time.perf_counter()
+
+            pts = index / self.fps if self.fps > 0 else t1 - start
+            frame = VideoFrame(pts, source, image, steps,
+                               (t1 - t0) * 1000, (t2 - t1) * 1000, t2)
+            if not self.buffer.put(frame, self.stopped):
+                break
+            self.decoded.tick()
+            index += 1
+        self.capture.release()
+        self.finished = True
+
+    def stop(self):
+        self.stopped.set()
+        self.buffer.wake()
+        if self.is_alive():
+            self.join()
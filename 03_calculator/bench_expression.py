@@ -0,0 +1,157 @@
+"""Expressions per second of the calculator's expression engine against
+eval(), and the cost of the Decimal and Fraction modes.
+
+Run with: python bench_expression.py [seconds per case]
+"""
+import random
+import sys
+import time
+import expression
+import precision
+
+
+def random_expression(rng, terms=8):
+    parts = [str(rng.randint(1, 999))]
+    for _ in range(terms - 1):
+        parts.append(rng.choice("+-*/"))
+        parts.append(str(rng.randint(1, 999)) if rng.random() < 0.8
+                     else f"({rng.randint(1, 99)}+{rng.randint(1, 99)})")
+    return "".join(parts)
+
+
+def rate(func, items, seconds):
+    """Calls of func per second, cycling through items for about seconds"""
+    count = 0
+    start = time.perf_counter()
+    while True:
+        for item in items:
+            func(item)
+        count += len(items)
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return count / elapsed
+
+
+def milliseconds(func, seconds):
+    """Average time of one call in ms, repeating for about seconds"""
+    count = 0
+    start = time.perf_counter()
+    while True:
+        func()
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return elapsed * 1000 / count
+
+
+def precision_modes(texts, seconds):
+    engines = [(mode, precision.make_engine(mode)) for mode in precision.MODES]
+    print(f"{'Mode (cached, small ints)':<26} {'expr/s':>12}")
+    for mode, engine in engines:
+        engine.cache_size = len(texts)
+        print(f"{mode:<26} {rate(engine.evaluate, texts, seconds):>12,.0f}")
+
+    # 10,000-digit integers, where Decimal rounds or keeps every digit
+    rng = random.Random(1)
+    values = {"a": rng.randrange(10 ** 9999, 10 ** 10000),
+              "b": rng.randrange(10 ** 9999, 10 ** 10000)}
+    engines = [("Float", precision.make_engine("Float")),
+               ("Decimal 28", precision.DecimalEngine(28)),
+               ("Decimal 20000", precision.DecimalEngine(20000)),
+               ("Fraction", precision.FractionEngine())]
+    texts = ["a+b", "a*b", "a//b", "a/b", "(a+0.5)*b", "sqrt(a)"]
+    print()
+    print(f"{'10,000 digits':<14}" + "".join(f"{name + ' ms':>17}" for name, _ in engines))
+    for text in texts:
+        row = f"{text:<14}"
+        for _, engine in engines:
+            compiled = engine.compile(text)
+            try:
+                compiled.evaluate(values)
+            except (OverflowError, ValueError) as e:
+                row += f"{type(e).__name__:>17}"
+                continue
+            row += f"{milliseconds(lambda: compiled.evaluate(values), seconds):>17.3f}"
+        print(row)
+
+
+def display_literals(seconds):
+    """Literal 10,000-digit expressions typed into the calculator, through
+    the same text parsing and result formatting as pressing "=" """
+    from PyQt6.QtWidgets import QApplication
+    import main as calculator_main
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    calculator = calculator_main.Calculator()
+    rng = random.Random(2)
+    a = expression.int_to_text(rng.randrange(10 ** 9999, 10 ** 10000))
+    b = expression.int_to_text(rng.randrange(10 ** 9999, 10 ** 10000))
+    texts = [a + "+" + b, a + "*" + b, a + "//" + b, a + "/" + b]
+    print()
+    print(f"{'Display, 10,000 digits':<24}" + "".join(f"{mode + ' ms':>14}" for mode in precision.MODES))
+    for text, name in zip(texts, ["a+b", "a*b", "a//b", "a/b"]):
+        row = f"{name:<24}"
+        for mode in precision.MODES:
+            calculator.mode_combo.setCurrentText(mode)
+
+            def press_equals():
+                calculator.display.setText(text)
+                calculator.calculate_result()
+
+            press_equals()
+            if calculator.display.text() == "Error":
+                row += f"{'Error':>14}"
+                continue
+            row += f"{milliseconds(press_equals, seconds):>14.3f}"
+        print(row)
+    calculator.close()
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    rng = random.Random(0)
+    texts = [random_expression(rng) for _ in range(1000)]
+    for text in texts:
+        assert expression.evaluate(text) == eval(text), text
+    # A long flat chain builds one closure per operator and must fail as
+    # an ExpressionError, not a RecursionError
+    for text in ["1+" * 1000 + "1", "x+" * 1000 + "x"]:
+        try:
+            expression.evaluate(text, {"x": 1})
+        except expression.ExpressionError:
+            continue
+        raise AssertionError(f"{text[:20]}... did not fail")
+
+    # Unique texts with no cache measure parsing and compiling
+    cold = expression.ExpressionEngine(cache_size=0)
+    warm = expression.ExpressionEngine(cache_size=len(texts))
+    cases = [
+        ("eval", lambda text: eval(text, {"__builtins__": {}})),
+        ("engine, uncached", cold.evaluate),
+        ("engine, cached", warm.evaluate),
+    ]
+    print(f"{'Literal expressions':<24} {'expr/s':>12}")
+    baseline = None
+    for name, func in cases:
+        per_second = rate(func, texts, seconds)
+        baseline = baseline or per_second
+        print(f"{name:<24} {per_second:>12,.0f}   {per_second / baseline:.1f}x")
+
+    # One expression over changing variables, as in table mode
+    compiled_eval = compile("a*b+c/(a+1)", "<expr>", "eval")
+    compiled = warm.compile("a*b+c/(a+1)")
+    rows = [{"a": rng.random(), "b": rng.random(), "c": rng.random()} for _ in range(1000)]
+    print()
+    print(f"{'With variables':<24} {'expr/s':>12}")
+    baseline = rate(lambda row: eval(compiled_eval, {"__builtins__": {}}, row), rows, seconds)
+    print(f"{'eval of code object':<24} {baseline:>12,.0f}   1.0x")
+    per_second = rate(compiled.evaluate, rows, seconds)
+    print(f"{'compiled expression':<24} {per_second:>12,.0f}   {per_second / baseline:.1f}x")
+
+    print()
+    precision_modes(texts, seconds)
+    display_literals(seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""A small, safe expression engine for the calculator.
+
+Expressions are tokenized and parsed into a tree once, then compiled into
+nested Python closures; there is no eval() and only the operators and
+functions listed here can be reached. Compiled expressions are kept in an
+LRU cache, so pressing "=" on the same text again costs a dict lookup.
+"""
+import math
+import operator
+import re
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+
+# Results of integer powers are limited to this many bits so "9**9**9"
+# fails quickly instead of hanging the application
+MAX_POWER_BITS = 1_000_000
+
+TOKEN_PATTERN = re.compile(r"""
+    (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_]\w*)
+  | (?P<op>\*\*|//|[-+*/%(),])
+  | (?P<space>\s+)
+  | (?P<error>.)
+""", re.VERBOSE)
+
+# Binding strength of binary operators; ** is right associative
+PRECEDENCE = {"+": 1, "-": 1, "*": 2, "/": 2, "//": 2, "%": 2, "**": 4}
+
+# A unary minus binds more loosely than ** on its right, so -2**2 is -4
+UNARY_OPERAND_PRECEDENCE = 4
+
+
+class ExpressionError(ValueError):
+    """Raised for text that is not a valid expression"""
+
+
+def check_power(base, exponent):
+    """Raise OverflowError if an exact base**exponent would be too large"""
+    if abs(base) > 1 and abs(exponent) * math.log2(abs(base)) > MAX_POWER_BITS:
+        raise OverflowError("Result is too large")
+
+
+def power(base, exponent):
+    if isinstance(base, int) and isinstance(exponent, int):
+        check_power(base, exponent)
+    return base ** exponent
+
+
+# Operator token -> function for binary and unary operators
+BINARY_OPERATORS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "//": operator.floordiv,
+    "%": operator.mod,
+    "**": power,
+}
+
+UNARY_OPERATORS = {
+    "-": operator.neg,
+    "+": operator.pos,
+}
+
+# Functions and constants that expressions may use
+FUNCTIONS = {
+    "abs": abs,
+    "round": round,
+    "min": min,
+    "max": max,
+    "sqrt": math.sqrt,
+    "exp": math.exp,
+    "log": math.log,
+    "log10": math.log10,
+    "sin": math.sin,
+    "cos": math.cos,
+    "tan": math.tan,
+    "asin": math.asin,
+    "acos": math.acos,
+    "atan": math.atan,
+    "floor": math.floor,
+    "ceil": math.ceil,
+}
+
+CONSTANTS = {
+    "pi": math.pi,
+    "e": math.e,
+}
+
+
+def tokenize(text):
+    """Split text into (kind, value) tokens, ending with an ("end", None) token"""
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        if kind == "space":
+            continue
+        if kind == "error":
+            raise ExpressionError(f"Unexpected character {match.group()!r} "
+                                  f"at position {match.start()}")
+        tokens.append((kind, match.group()))
+    tokens.append(("end", None))
+    return tokens
+
+
+class Parser:
+    """Precedence climbing parser producing tuples.
+
+    Nodes are ("number", text), ("name", name), ("unary", op, operand),
+    ("binary", op, left, right) and ("call", name, arguments). Precedence
+    and associativity follow Python, so -2**2 is -4.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def take(self, value=None):
+        kind, token = self.tokens[self.position]
+        if kind == "end":
+            raise ExpressionError("Unexpected end of expression")
+        if value is not None and token != value:
+            raise ExpressionError(f"Expected {value!r} but found {token!r}")
+        self.position += 1
+        return kind, token
+
+    def parse(self):
+        if len(self.tokens) == 1:
+            raise ExpressionError("Empty expression")
+        node = self.binary(1)
+        kind, token = self.tokens[self.position]
+        if kind != "end":
+            raise ExpressionError(f"Unexpected {token!r}")
+        return node
+
+    def binary(self, min_precedence):
+        node = self.unary()
+        while True:
+            kind, op = self.tokens[self.position]
+            precedence = PRECEDENCE.get(op) if kind == "op" else None
+            if precedence is None or precedence < min_precedence:
+                return node
+            self.position += 1
+            # Left associative operators only take tighter operators on the right
+            right = self.binary(precedence if op == "**" else precedence + 1)
+            node = ("binary", op, node, right)
+
+    def unary(self):
+        kind, op = self.tokens[self.position]
+        if kind == "op" and (op == "-" or op == "+"):
+            self.position += 1
+            return ("unary", op, self.binary(UNARY_OPERAND_PRECEDENCE))
+        return self.primary()
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == "number":
+            return ("number", value)
+        if kind == "name":
+            if self.tokens[self.position] != ("op", "("):
+                return ("name", value)
+            self.position += 1
+            arguments = []
+            if self.tokens[self.position] != ("op", ")"):
+                arguments.append(self.binary(1))
+                while self.tokens[self.position] == ("op", ","):
+                    self.position += 1
+                    arguments.append(self.binary(1))
+            self.take(")")
+            return ("call", value, tuple(arguments))
+        if value == "(":
+            node = self.binary(1)
+            self.take(")")
+            return node
+        raise ExpressionError(f"Unexpected {value!r}")
+
+
+def parse(text):
+    """Parse expression text into a tree of tuples"""
+    try:
+        return Parser(tokenize(text)).parse()
+    except RecursionError:
+        raise ExpressionError("Expression is nested too deeply") from None
+
+
+def int_from_text(text):
+    """int(text) for any number of digits"""
+    try:
+        return int(text)
+    except ValueError:
+        # int() refuses more than sys.get_int_max_str_digits() digits;
+        # Decimal has no such limit and converts exactly
+        return int(Decimal(text))
+
+
+def int_to_text(value):
+    """str(value) of an int with any number of digits"""
+    try:
+        return str(value)
+    except ValueError:
+        return format(Decimal(value), "f")
+
+
+def parse_number(text):
+    """Integer literals stay exact ints; anything else is a float, as in Python"""
+    if text.isdigit():
+        return int_from_text(text)
+    return float(text)
+
+
+class Expression:
+    """A compiled expression; call evaluate() with values for its variables"""
+
+    def __init__(self, text, tree, function, variables):
+        self.text = text
+        self.tree = tree
+        self.function = function
+        self.variables = variables
+
+    def evaluate(self, variables=None):
+        missing = self.variables.difference(variables or {})
+        if missing:
+            raise ExpressionError(f"No value for {', '.join(sorted(missing))}")
+        try:
+            return self.function(variables)
+        except RecursionError:
+            # Closures nest as deeply as the tree
+            raise ExpressionError("Expression is nested too deeply") from None
+
+    def __repr__(self):
+        return f"Expression({self.text!r})"
+
+
+class ExpressionEngine:
+    """Compiles expressions against a set of functions and constants.
+
+    number converts numeric literals and operators maps operator tokens to
+    functions, so the same engine can run on ints and floats, Decimal or
+    NumPy values. Compiled expressions are cached
+    by text in an LRU of cache_size entries, which may be shared between
+    threads.
+    """
+
+    def __init__(self, functions=None, constants=None, number=parse_number, operators=None,
+                 cache_size=256):
+        self.functions = FUNCTIONS if functions is None else functions
+        self.constants = CONSTANTS if constants is None else constants
+        self.number = number
+        self.operators = BINARY_OPERATORS if operators is None else operators
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def compile(self, text):
+        with self.lock:
+            expression = self.cache.get(text)
+            if expression is not None:
+                self.cache.move_to_end(text)
+                self.hits += 1
+                return expression
+            self.misses += 1
+
+        tree = parse(text)
+        variables = set()
+        try:
+            # A long flat chain such as 1+1+...+1 parses in a loop but
+            # builds one level per operator
+            function = self.build(tree, variables)
+        except RecursionError:
+            raise ExpressionError("Expression is nested too deeply") from None
+        expression = Expression(text, tree, function, frozenset(variables))
+        with self.lock:
+            self.cache[text] = expression
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return expression
+
+    def evaluate(self, text, variables=None):
+        return self.compile(text).evaluate(variables)
+
+    def build(self, tree, variables=None):
+        """Turn a tree into a closure taking the variables dict, adding
+        the names of the variables it reads to variables.
+
+        Subtrees without variables are evaluated once here, so an
+        expression of literals compiles to a constant.
+        """
+        function, constant = self._build(tree, set() if variables is None else variables)
+        if function is None:
+            return lambda values: constant
+        return function
+
+    def _build(self, tree, variables):
+        # Returns (closure, None) or (None, constant value)
+        kind = tree[0]
+        if kind == "number":
+            return None, self.number(tree[1])
+
+        if kind == "name":
+            name = tree[1]
+            if name in self.constants:
+                return None, self.constants[name]
+            if name in self.functions:
+                raise ExpressionError(f"{name} is a function")
+            variables.add(name)
+            return (lambda values: values[name]), None
+
+        if kind == "unary":
+            op = UNARY_OPERATORS[tree[1]]
+            operand, value = self._build(tree[2], variables)
+            if operand is None:
+                return self._fold(op, value)
+            return (lambda values: op(operand(values))), None
+
+        if kind == "binary":
+            op = self.operators[tree[1]]
+            left, left_value = self._build(tree[2], variables)
+            right, right_value = self._build(tree[3], variables)
+            if left is None and right is None:
+                return self._fold(op, left_value, right_value)
+            if left is None:
+                return (lambda values: op(left_value, right(values))), None
+            if right is None:
+                return (lambda values: op(left(values), right_value)), None
+            return (lambda values: op(left(values), right(values))), None
+
+        # Function call
+        name, arguments = tree[1], tree[2]
+        if name not in self.functions:
+            raise ExpressionError(f"Unknown function {name!r}")
+        func = self.functions[name]
+        built = [self._build(argument, variables) for argument in arguments]
+        if all(closure is None for closure, _ in built):
+            return self._fold(func, *(value for _, value in built))
+        closures = [closure if closure is not None else (lambda values, value=value: value)
+                    for closure, value in built]
+        return (lambda values: func(*(closure(values) for closure in closures))), None
+
+    @staticmethod
+    def _fold(func, *arguments):
+        try:
+            return None, func(*arguments)
+        except Exception:
+            # Errors such as 1/0 are left to be raised on evaluation
+            return (lambda values: func(*arguments)), None
+
+
+# Engine used when no other is given
+DEFAULT_ENGINE = ExpressionEngine()
+
+
+def evaluate(text, variables=None):
+    """Evaluate expression text with the default engine"""
+    return DEFAULT_ENGINE.evaluate(text, variables)
@@ -1,11 +1,49 @@
 import sys
+import os
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
-                            QGridLayout, QPushButton, QLineEdit)
-from PyQt6.QtCore import Qt
+                            QGridLayout, QPushButton, QLineEdit, QFileDialog,
+                            QInputDialog, QMessageBox, QHBoxLayout, QComboBox,
+                            QSpinBox, QLabel)
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+import expression
+import plot
+import precision
+import table
+
+class TableSignals(QObject):
+    """Signals emitted by TableTask from the thread pool"""
+    progress = pyqtSignal(int)  # rows written so far
+    finished = pyqtSignal(object)  # rows written, or None if cancelled
+    failed = pyqtSignal(str)
+
+class TableTask(QRunnable):
+    """Evaluates an expression over a CSV file on a pool thread"""
+    
+    def __init__(self, text, input_path, output_path, bindings):
+        super().__init__()
+        self.signals = TableSignals()
+        self.text = text
+        self.input_path = input_path
+        self.output_path = output_path
+        self.bindings = bindings
+        self.cancel_requested = False
+    
+    def run(self):
+        try:
+            rows = table.evaluate_table(self.text, self.input_path, self.output_path,
+                                        self.bindings, progress=self.signals.progress.emit,
+                                        cancelled=lambda: self.cancel_requested)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(rows)
 
 class Calculator(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.thread_pool = QThreadPool()
+        self.table_task = None
+        self.engine = precision.make_engine("Float")
         self.init_ui()
         self.reset_calc()
 
@@ -17,16 +55,44 @@ class Calculator(QMainWindow):
         # Create central widget and layouts
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
-        main_layout = QVBoxLayout(central_widget)
+        window_layout = QHBoxLayout(central_widget)
+        main_layout = QVBoxLayout()
+        window_layout.addLayout(main_layout)
         
         # Create display
         self.display = QLineEdit()
         self.display.setAlignment(Qt.AlignmentFlag.AlignRight)
-        self.display.setReadOnly(True)
+        # Typing is allowed so expressions can use variables in table mode
+        self.display.returnPressed.connect(self.calculate_result)
+        self.display.textChanged.connect(self.update_plot)
         self.display.setFixedHeight(50)
         self.display.setStyleSheet("font-size: 20px; padding: 5px;")
         main_layout.addWidget(self.display)
         
+        # Number mode and the precision used by Decimal mode
+        mode_layout = QHBoxLayout()
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems(precision.MODES)
+        self.mode_combo.currentTextChanged.connect(self.set_mode)
+        mode_layout.addWidget(self.mode_combo)
+        mode_layout.addWidget(QLabel("Digits:"))
+        self.precision_spin = QSpinBox()
+        self.precision_spin.setRange(1, 100000)
+        self.precision_spin.setValue(precision.DEFAULT_PRECISION)
+        self.precision_spin.setEnabled(False)
+        self.precision_spin.valueChanged.connect(self.set_mode)
+        mode_layout.addWidget(self.precision_spin)
+        self.plot_button = QPushButton("Plot")
+        self.plot_button.setCheckable(True)
+        self.plot_button.toggled.connect(self.toggle_plot)
+        mode_layout.addWidget(self.plot_button)
+        main_layout.addLayout(mode_layout)
+        
+        # Graph of the display as a function of x, shown beside the keypad
+        self.plot_view = plot.PlotView()
+        self.plot_view.hide()
+        window_layout.addWidget(self.plot_view, 1)
+        
         # Create button grid
         grid_layout = QGridLayout()
         main_layout.addLayout(grid_layout)
@@ -37,7 +103,8 @@ class Calculator(QMainWindow):
             ('4', 1, 0), ('5', 1, 1), ('6', 1, 2), ('*', 1, 3),
             ('1', 2, 0), ('2', 2, 1), ('3', 2, 2), ('-', 2, 3),
             ('0', 3, 0), ('.', 3, 1), ('=', 3, 2), ('+', 3, 3),
-            ('C', 4, 0, 1, 4)  # Spans all 4 columns
+            ('C', 4, 0, 1, 4),  # Spans all 4 columns
+            ('Table...', 5, 0, 1, 4)
         ]
         
         # Create and add buttons to grid
@@ -51,6 +118,9 @@ class Calculator(QMainWindow):
                 button.clicked.connect(self.calculate_result)
             elif btn_text == 'C':
                 button.clicked.connect(self.clear_display)
+            elif btn_text == 'Table...':
+                self.table_button = button
+                button.clicked.connect(self.run_table_mode)
             else:
                 button.clicked.connect(lambda checked, text=btn_text: self.add_to_display(text))
             
@@ -73,9 +143,9 @@ class Calculator(QMainWindow):
     
     def calculate_result(self):
         try:
-            expression = self.display.text()
-            result = eval(expression)
-            self.display.setText(str(result))
+            # Parsed and evaluated without eval(); repeated text is cached
+            result = self.engine.evaluate(self.display.text())
+            self.display.setText(precision.format_result(result, self.precision_spin.value()))
             self.reset_next = True
         except Exception as e:
             self.display.setText("Error")
@@ -83,6 +153,98 @@ class Calculator(QMainWindow):
     
     def reset_calc(self):
         self.reset_next = False
+    
+    def set_mode(self):
+        mode = self.mode_combo.currentText()
+        self.precision_spin.setEnabled(mode == "Decimal")
+        # Each engine has its own cache, so results of the old mode aren't reused
+        self.engine = precision.make_engine(mode, self.precision_spin.value())
+    
+    def toggle_plot(self, checked):
+        self.plot_view.setVisible(checked)
+        if checked:
+            self.resize(self.width() + self.plot_view.minimumWidth() * 2, self.height())
+            self.update_plot()
+        else:
+            self.adjustSize()
+    
+    def update_plot(self):
+        if self.plot_view.isVisible():
+            self.plot_view.set_expression(self.display.text())
+    
+    def run_table_mode(self):
+        """Evaluate the displayed expression over the columns of a CSV file"""
+        if self.table_task is not None:
+            # The button cancels a run in progress
+            self.table_task.cancel_requested = True
+            return
+        
+        text = self.display.text()
+        try:
+            expression.DEFAULT_ENGINE.compile(text)
+        except expression.ExpressionError as e:
+            QMessageBox.critical(self, "Error", f"Invalid expression: {str(e)}")
+            return
+        
+        input_path, _ = QFileDialog.getOpenFileName(
+            self, "Open CSV", "", "CSV Files (*.csv);;All Files (*)")
+        if not input_path:
+            return
+        try:
+            header = table.read_header(input_path)
+            bindings = {}
+            missing = table.unbound_variables(text, header, bindings)
+            if missing:
+                # Ask for columns whose names differ from the variables
+                bindings_text, ok = QInputDialog.getText(
+                    self, "Bind Variables",
+                    f"Columns: {', '.join(header)}\nBind as variable=column:",
+                    text=", ".join(f"{name}=" for name in missing))
+                if not ok:
+                    return
+                bindings = table.parse_bindings(bindings_text)
+                missing = table.unbound_variables(text, header, bindings)
+                if missing:
+                    raise ValueError(f"No column for {', '.join(missing)}")
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Error", f"Could not use file: {str(e)}")
+            return
+        
+        root, extension = os.path.splitext(input_path)
+        output_path, _ = QFileDialog.getSaveFileName(
+            self, "Save Results", f"{root}_result{extension}", "CSV Files (*.csv)")
+        if not output_path:
+            return
+        
+        self.table_task = TableTask(text, input_path, output_path, bindings)
+        self.table_task.signals.progress.connect(
+            lambda rows: self.statusBar().showMessage(f"Evaluated {rows:,} rows..."))
+        self.table_task.signals.finished.connect(self.on_table_finished)
+        self.table_task.signals.failed.connect(self.on_table_failed)
+        self.table_button.setText("Cancel")
+        self.statusBar().showMessage("Evaluating...")
+        self.thread_pool.start(self.table_task)
+    
+    def on_table_finished(self, rows):
+        self.table_task = None
+        self.table_button.setText("Table...")
+        if rows is None:
+            self.statusBar().showMessage("Cancelled")
+        else:
+            self.statusBar().showMessage(f"Wrote {rows:,} rows")
+    
+    def on_table_failed(self, error):
+        self.table_task = None
+        self.table_button.setText("Table...")
+        self.statusBar().clearMessage()
+        QMessageBox.critical(self, "Error", f"Table evaluation failed: {error}")
+    
+    def closeEvent(self, event):
+        # Let a running table evaluation stop before the window goes
+        if self.table_task is not None:
+            self.table_task.cancel_requested = True
+        self.thread_pool.waitForDone()
+        event.accept()
 
 def main():
     app = QApplication(sys.argv)
@@ -0,0 +1,295 @@
+"""Plot view for the calculator: graphs f(x) typed on the display.
+
+CurveSampler evaluates the function with the vectorized NumPy engine and
+refines adaptively: each segment remembers how far its midpoint was from a
+straight line, so it is only split again once the view's tolerance drops
+below that. Samples are kept across views, so a pan only evaluates the
+newly exposed strip and a zoom only refines the segments that are no
+longer flat enough. Rendered curves are cached as QPainterPaths per
+viewport.
+"""
+from collections import OrderedDict
+import numpy as np
+from PyQt6.QtCore import Qt, QPointF
+from PyQt6.QtGui import QPainter, QPainterPath, QPen, QColor
+from PyQt6.QtWidgets import QWidget
+import expression
+import table
+
+# Initial samples per pixel of width, and the finest refinement
+BASE_SAMPLES_PER_PIXEL = 0.25
+MIN_STEP_PER_PIXEL = 1 / 8
+
+# Largest deviation from a straight segment, in pixels
+TOLERANCE_PIXELS = 0.5
+
+MAX_REFINE_PASSES = 24
+MAX_SAMPLES = 200_000
+
+# Rendered paths kept for recently shown viewports
+PATH_CACHE_SIZE = 16
+
+# Denser curves are drawn with a hairline; stroking a wide pen over a
+# zigzag that fills the view takes seconds
+WIDE_PEN_POINTS_PER_PIXEL = 2
+
+ZOOM_STEP = 1.25
+DEFAULT_X_RANGE = (-10.0, 10.0)
+
+
+class CurveSampler:
+    """Sorted samples of a vectorized function, reused across views"""
+
+    def __init__(self, func, max_samples=MAX_SAMPLES):
+        self.func = func
+        self.max_samples = max_samples
+        self.xs = np.empty(0)
+        self.ys = np.empty(0)
+        # Midpoint deviation of each segment (xs[i], xs[i + 1]); inf if untested
+        self.deviation = np.empty(0)
+        self.evaluations = 0
+
+    def evaluate(self, xs):
+        self.evaluations += len(xs)
+        try:
+            with np.errstate(all="ignore"):
+                ys = np.asarray(self.func(xs), dtype=np.float64)
+        except (ArithmeticError, ValueError, TypeError):
+            # Such as a constant 1/0; the whole curve is undefined
+            ys = np.nan
+        return np.broadcast_to(ys, xs.shape).copy()
+
+    def insert(self, xs, ys, values):
+        """Merge new points; segments next to a new point get its value"""
+        old_count = len(self.xs)
+        all_xs = np.concatenate([self.xs, xs])
+        order = np.argsort(all_xs, kind="stable")
+        origin = order.copy()
+        origin[origin >= old_count] = -1
+        point_value = np.concatenate([np.full(old_count, -np.inf), values])[order]
+
+        # Segments between two formerly adjacent points keep their deviation
+        deviation = np.maximum(point_value[:-1], point_value[1:])
+        kept = (origin[:-1] >= 0) & (origin[1:] == origin[:-1] + 1)
+        deviation[kept] = self.deviation[origin[:-1][kept]]
+
+        self.xs = all_xs[order]
+        self.ys = np.concatenate([self.ys, ys])[order]
+        self.deviation = deviation
+
+    def sample(self, x0, x1, tolerance, base_step, min_step):
+        """Samples covering [x0, x1] whose segments deviate from the curve
+        by at most tolerance, or are no wider than min_step"""
+        # Fill gaps wider than the base step with a regular grid
+        grid = np.linspace(x0, x1, max(2, int((x1 - x0) / base_step) + 1))
+        if len(self.xs):
+            right = np.searchsorted(self.xs, grid)
+            left_gap = grid - self.xs[np.maximum(right - 1, 0)]
+            right_gap = self.xs[np.minimum(right, len(self.xs) - 1)] - grid
+            left_gap[right == 0] = np.inf
+            right_gap[right == len(self.xs)] = np.inf
+            grid = grid[np.minimum(left_gap, right_gap) > base_step / 2]
+        if len(grid):
+            self.insert(grid, self.evaluate(grid), np.full(len(grid), np.inf))
+
+        for _ in range(MAX_REFINE_PASSES):
+            first = max(0, np.searchsorted(self.xs, x0, side="right") - 1)
+            last = min(len(self.xs) - 1, np.searchsorted(self.xs, x1))
+            segments = np.arange(first, last)
+            width = self.xs[segments + 1] - self.xs[segments]
+            segments = segments[(self.deviation[segments] > tolerance) & (width > min_step)]
+            if not len(segments):
+                break
+
+            middle = (self.xs[segments] + self.xs[segments + 1]) / 2
+            y_middle = self.evaluate(middle)
+            y_left, y_right = self.ys[segments], self.ys[segments + 1]
+            with np.errstate(invalid="ignore"):
+                deviation = np.abs(y_middle - (y_left + y_right) / 2)
+            # Undefined stretches count as flat; an edge of one never does
+            finite = np.isfinite([y_left, y_middle, y_right])
+            deviation[~finite.any(axis=0)] = 0
+            deviation[finite.any(axis=0) & ~finite.all(axis=0)] = np.inf
+            self.insert(middle, y_middle, deviation)
+
+        if len(self.xs) > self.max_samples:
+            # Forget samples well away from the view
+            span = x1 - x0
+            start = np.searchsorted(self.xs, x0 - span)
+            stop = max(start + 1, np.searchsorted(self.xs, x1 + span))
+            self.xs, self.ys = self.xs[start:stop], self.ys[start:stop]
+            self.deviation = self.deviation[start:stop - 1]
+
+        first = max(0, np.searchsorted(self.xs, x0, side="right") - 1)
+        last = min(len(self.xs), np.searchsorted(self.xs, x1) + 1)
+        return self.xs[first:last], self.ys[first:last]
+
+
+def decimate(sx, sy):
+    """Keep the first, last, lowest and highest point of each pixel column"""
+    columns = np.floor(sx)
+    starts = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+    if len(starts) * 4 >= len(sx):
+        return sx, sy
+    ends = np.r_[starts[1:], len(sx)] - 1
+    order = np.lexsort((sy, columns))
+    keep = np.concatenate([starts, ends, order[starts], order[ends],
+                           np.flatnonzero(~np.isfinite(sy))])
+    keep = np.unique(keep)
+    return sx[keep], sy[keep]
+
+
+class PlotView(QWidget):
+    """Graph of the expression on the calculator display as a function of x"""
+
+    def __init__(self):
+        super().__init__()
+        self.setMinimumSize(300, 300)
+        self.text = None
+        self.sampler = None
+        self.x_range = DEFAULT_X_RANGE
+        self.y_range = DEFAULT_X_RANGE
+        self.paths = OrderedDict()
+        self.drag_start = None
+
+    def set_expression(self, text):
+        """Plot text if it is an expression of x alone, otherwise clear the plot"""
+        if text == self.text:
+            return
+        self.text = text
+        self.paths.clear()
+        try:
+            compiled = table.ENGINE.compile(text)
+        except expression.ExpressionError:
+            compiled = None
+        if compiled is None or not compiled.variables <= {"x"}:
+            self.sampler = None
+        else:
+            self.sampler = CurveSampler(lambda xs: compiled.evaluate({"x": xs}))
+            self.fit_view()
+        self.update()
+
+    def fit_view(self):
+        """Reset x to the default range and fit y to the curve"""
+        self.x_range = DEFAULT_X_RANGE
+        self.y_range = DEFAULT_X_RANGE
+        if self.sampler is not None:
+            _, ys = self.sample()
+            ys = ys[np.isfinite(ys)]
+            if len(ys):
+                # Percentiles keep poles such as tan(x) from squashing the rest
+                low, high = np.percentile(ys, [5, 95])
+                margin = (high - low) * 0.1 or max(1.0, abs(high))
+                self.y_range = (float(low - margin), float(high + margin))
+        self.update()
+
+    def sample(self):
+        x0, x1 = self.x_range
+        y0, y1 = self.y_range
+        width, height = max(1, self.width()), max(1, self.height())
+        x_per_pixel = (x1 - x0) / width
+        return self.sampler.sample(x0, x1, TOLERANCE_PIXELS * (y1 - y0) / height,
+                                   x_per_pixel / BASE_SAMPLES_PER_PIXEL,
+                                   x_per_pixel * MIN_STEP_PER_PIXEL)
+
+    def to_screen(self, xs, ys):
+        (x0, x1), (y0, y1) = self.x_range, self.y_range
+        sx = (xs - x0) * (self.width() / (x1 - x0))
+        sy = self.height() - (ys - y0) * (self.height() / (y1 - y0))
+        return sx, sy
+
+    def curve_path(self):
+        """The curve for the current viewport, from the cache if possible"""
+        key = (self.x_range, self.y_range, self.width(), self.height())
+        path = self.paths.get(key)
+        if path is not None:
+            self.paths.move_to_end(key)
+            return path
+
+        xs, ys = self.sample()
+        sx, sy = decimate(*self.to_screen(xs, ys))
+        height = self.height()
+        finite = np.isfinite(sy)
+        # Far off-screen values are clamped so the painter stays in range
+        sy = np.clip(sy, -10 * height, 11 * height)
+        # Break at undefined points and at jumps refinement could not resolve
+        jumps = np.abs(np.diff(sy)) > height
+        jumps &= np.diff(sx) <= 2 * MIN_STEP_PER_PIXEL
+        breaks = np.r_[True, jumps] | ~np.r_[True, finite[:-1]]
+
+        path = QPainterPath()
+        for x, y, ok, new_run in zip(sx.tolist(), sy.tolist(), finite.tolist(), breaks.tolist()):
+            if not ok:
+                continue
+            if new_run:
+                path.moveTo(x, y)
+            else:
+                path.lineTo(x, y)
+
+        self.paths[key] = path
+        if len(self.paths) > PATH_CACHE_SIZE:
+            self.paths.popitem(last=False)
+        return path
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(255, 255, 255))
+        if self.sampler is None:
+            painter.setPen(QColor(120, 120, 120))
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter,
+                             "Type an expression of x to plot it")
+            return
+
+        # Axes through the origin when it is in view
+        painter.setPen(QPen(QColor(170, 170, 170), 1))
+        origin_x, origin_y = self.to_screen(np.array([0.0]), np.array([0.0]))
+        painter.drawLine(QPointF(origin_x[0], 0), QPointF(origin_x[0], self.height()))
+        painter.drawLine(QPointF(0, origin_y[0]), QPointF(self.width(), origin_y[0]))
+
+        path = self.curve_path()
+        wide = path.elementCount() <= WIDE_PEN_POINTS_PER_PIXEL * self.width()
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(QColor(30, 90, 200), 2 if wide else 0))
+        painter.drawPath(path)
+
+        painter.setPen(QColor(90, 90, 90))
+        (x0, x1), (y0, y1) = self.x_range, self.y_range
+        painter.drawText(6, 16, f"x {x0:.4g} .. {x1:.4g}   y {y0:.4g} .. {y1:.4g}")
+
+    def wheelEvent(self, event):
+        if self.sampler is None:
+            return
+        factor = ZOOM_STEP ** (-event.angleDelta().y() / 120)
+        # Zoom about the point under the cursor
+        position = event.position()
+        (x0, x1), (y0, y1) = self.x_range, self.y_range
+        x = x0 + position.x() / self.width() * (x1 - x0)
+        y = y1 - position.y() / self.height() * (y1 - y0)
+        self.x_range = (x + (x0 - x) * factor, x + (x1 - x) * factor)
+        self.y_range = (y + (y0 - y) * factor, y + (y1 - y) * factor)
+        self.update()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.drag_start = event.position()
+            self.setCursor(Qt.CursorShape.ClosedHandCursor)
+
+    def mouseMoveEvent(self, event):
+        if self.drag_start is None:
+            return
+        delta = event.position() - self.drag_start
+        self.drag_start = event.position()
+        (x0, x1), (y0, y1) = self.x_range, self.y_range
+        dx = -delta.x() / self.width() * (x1 - x0)
+        dy = delta.y() / self.height() * (y1 - y0)
+        self.x_range = (x0 + dx, x1 + dx)
+        self.y_range = (y0 + dy, y1 + dy)
+        self.update()
+
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.drag_start = None
+            self.unsetCursor()
+
+    def mouseDoubleClickEvent(self, event):
+        self.fit_view()
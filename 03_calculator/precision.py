@@ -0,0 +1,242 @@
+"""Exact arithmetic modes for the calculator.
+
+DecimalEngine and FractionEngine evaluate the same expressions as the
+float engine, with decimal.Decimal or fractions.Fraction values. Integer
+arithmetic is already exact, so both keep ints as ints and only promote a
+value when a result is not whole, as in 1/3 or 0.1+0.2. Whole-number
+calculations therefore run on plain ints as they do in float mode.
+"""
+import decimal
+import math
+from collections.abc import Mapping
+from decimal import Decimal
+from fractions import Fraction
+import expression
+
+DEFAULT_PRECISION = 28
+
+# Calculator modes in the order they are offered
+MODES = ("Float", "Decimal", "Fraction")
+
+
+def _whole(value):
+    # Whole fractions go back to the int fast path
+    if type(value) is Fraction and value.denominator == 1:
+        return value.numerator
+    return value
+
+
+def _mixed(op):
+    """op for Decimal mode, falling back to floats for inexact operands"""
+    def apply(a, b):
+        try:
+            return op(a, b)
+        except TypeError:
+            # Decimal and float don't mix; a float has already lost precision
+            return op(float(a), float(b))
+    return apply
+
+
+def decimal_number(text):
+    return expression.int_from_text(text) if text.isdigit() else Decimal(text)
+
+
+def decimal_divide(a, b):
+    if type(a) is int and type(b) is int:
+        if b and a % b == 0:
+            return a // b
+        return Decimal(a) / b
+    if isinstance(a, float) or isinstance(b, float):
+        return float(a) / float(b)
+    return Decimal(a) / b
+
+
+def decimal_power(a, b):
+    if type(a) is int and type(b) is int and b >= 0:
+        return expression.power(a, b)
+    if isinstance(a, float) or isinstance(b, float):
+        return float(a) ** float(b)
+    return Decimal(a) ** b
+
+
+def decimal_sqrt(x):
+    if type(x) is int and x >= 0:
+        root = math.isqrt(x)
+        if root * root == x:
+            return root
+    return Decimal(x).sqrt()
+
+
+def decimal_log(x, base=None):
+    if base is None:
+        return Decimal(x).ln()
+    return Decimal(x).ln() / Decimal(base).ln()
+
+
+DECIMAL_OPERATORS = {
+    **{op: _mixed(func) for op, func in expression.BINARY_OPERATORS.items()},
+    "/": decimal_divide,
+    "**": decimal_power,
+}
+
+DECIMAL_FUNCTIONS = {
+    **expression.FUNCTIONS,
+    "sqrt": decimal_sqrt,
+    "exp": lambda x: Decimal(x).exp(),
+    "log": decimal_log,
+    "log10": lambda x: Decimal(x).log10(),
+}
+
+
+def pi_digits(digits):
+    """Pi * 10**digits as an int, from Machin's formula in integer arithmetic"""
+    guard = 10
+    unity = 10 ** (digits + guard)
+
+    def arctan_inverse(x):
+        total = term = unity // x
+        x_squared = x * x
+        n = 3
+        sign = -1
+        while term:
+            term //= x_squared
+            total += sign * (term // n)
+            sign = -sign
+            n += 2
+        return total
+
+    return 4 * (4 * arctan_inverse(5) - arctan_inverse(239)) // 10 ** guard
+
+
+class DecimalConstants(Mapping):
+    """pi and e, computed to the context's precision the first time they are used"""
+
+    def __init__(self, context):
+        self.context = context
+        self.values = {}
+
+    def __getitem__(self, name):
+        if name not in expression.CONSTANTS:
+            raise KeyError(name)
+        if name not in self.values:
+            with decimal.localcontext(self.context) as context:
+                if name == "pi":
+                    digits = context.prec + 2
+                    value = Decimal(pi_digits(digits)).scaleb(-digits)
+                else:
+                    value = Decimal(1).exp()
+                # Unary plus rounds to the context precision
+                self.values[name] = +value
+        return self.values[name]
+
+    def __iter__(self):
+        return iter(expression.CONSTANTS)
+
+    def __len__(self):
+        return len(expression.CONSTANTS)
+
+
+class DecimalEngine(expression.ExpressionEngine):
+    """Evaluates with Decimal values rounded to precision significant digits"""
+
+    def __init__(self, precision=DEFAULT_PRECISION, cache_size=256):
+        self.context = decimal.Context(prec=precision)
+        super().__init__(DECIMAL_FUNCTIONS, DecimalConstants(self.context), decimal_number,
+                         DECIMAL_OPERATORS, cache_size)
+
+    def build(self, tree, variables=None):
+        # Constant folding and evaluation both round with this engine's context
+        context = self.context
+        variables = set() if variables is None else variables
+        with decimal.localcontext(context):
+            function = super().build(tree, variables)
+        if not variables:
+            # Folded to a constant, or to an error that is raised either way
+            return function
+
+        def run(values):
+            with decimal.localcontext(context):
+                return function(values)
+        return run
+
+
+def fraction_number(text):
+    if text.isdigit():
+        return expression.int_from_text(text)
+    # Through Decimal, which reads any number of digits exactly
+    return _whole(Fraction(Decimal(text)))
+
+
+def _fraction_op(op):
+    """op for Fraction mode, turning whole results back into ints"""
+    return lambda a, b: _whole(op(a, b))
+
+
+def fraction_divide(a, b):
+    if type(a) is int and type(b) is int and b and a % b == 0:
+        return a // b
+    if isinstance(a, float) or isinstance(b, float):
+        return a / b
+    return _whole(Fraction(a) / b)
+
+
+def fraction_power(a, b):
+    if type(a) is int and type(b) is int and b >= 0:
+        return expression.power(a, b)
+    if isinstance(a, float) or not isinstance(b, int):
+        # A fractional exponent gives a float, as Fraction itself does
+        return a ** b
+    base = Fraction(a)
+    expression.check_power(max(abs(base.numerator), base.denominator), b)
+    return _whole(base ** b)
+
+
+def fraction_sqrt(x):
+    if isinstance(x, (int, Fraction)) and x >= 0:
+        x = Fraction(x)
+        numerator, denominator = math.isqrt(x.numerator), math.isqrt(x.denominator)
+        if numerator ** 2 == x.numerator and denominator ** 2 == x.denominator:
+            return _whole(Fraction(numerator, denominator))
+    return math.sqrt(x)
+
+
+FRACTION_OPERATORS = {
+    **{op: _fraction_op(func) for op, func in expression.BINARY_OPERATORS.items()},
+    "/": fraction_divide,
+    "**": fraction_power,
+}
+
+FRACTION_FUNCTIONS = {
+    **expression.FUNCTIONS,
+    "sqrt": fraction_sqrt,
+}
+
+
+class FractionEngine(expression.ExpressionEngine):
+    """Evaluates with exact rationals; irrational functions fall back to float"""
+
+    def __init__(self, cache_size=256):
+        super().__init__(FRACTION_FUNCTIONS, expression.CONSTANTS, fraction_number,
+                         FRACTION_OPERATORS, cache_size)
+
+
+def format_result(value, precision=DEFAULT_PRECISION):
+    """Text for the display; Decimals such as 1E+3 are written out in full
+    when that takes no more than precision digits"""
+    if isinstance(value, Decimal) and value.is_finite() and value.as_tuple().exponent > 0:
+        if value.adjusted() < precision:
+            return format(value, "f")
+    if type(value) is int:
+        return expression.int_to_text(value)
+    if isinstance(value, Fraction):
+        return f"{expression.int_to_text(value.numerator)}/{expression.int_to_text(value.denominator)}"
+    return str(value)
+
+
+def make_engine(mode, precision=DEFAULT_PRECISION):
+    """An engine for one of MODES"""
+    if mode == "Decimal":
+        return DecimalEngine(precision)
+    if mode == "Fraction":
+        return FractionEngine()
+    return expression.ExpressionEngine()
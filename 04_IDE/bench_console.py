@@ -0,0 +1,72 @@
+"""Lines per second and memory held by the output console while a script
+prints a flood of lines, against the original QTextEdit.append console.
+
+Run with: python bench_console.py [lines] [legacy lines]
+"""
+import sys
+import time
+from PyQt6.QtWidgets import QApplication, QTextEdit
+from console import OutputConsole
+
+# Lines per chunk, about what one read from a busy pipe returns
+CHUNK_LINES = 1000
+
+
+def resident_memory():
+    """Current resident memory of this process in bytes, or 0 without /proc"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def feed(app, write, lines):
+    """Write lines in chunks, letting the event loop run between chunks as
+    it does between reads from a running process; returns lines/s"""
+    chunk = "".join(f"output line {i:>6} of a long running script\n" for i in range(CHUNK_LINES))
+    start = time.perf_counter()
+    for _ in range(lines // CHUNK_LINES):
+        write(chunk)
+        app.processEvents()
+    app.processEvents()
+    return lines / (time.perf_counter() - start)
+
+
+def run_case(app, name, widget, write, lines, flush=None):
+    widget.show()
+    app.processEvents()
+    before = resident_memory()
+    per_second = feed(app, write, lines)
+    if flush is not None:
+        flush()
+    app.processEvents()
+    held = (resident_memory() - before) / 2**20
+    print(f"{name:<28} {lines:>12,} {per_second:>12,.0f} {held:>10.1f}")
+    widget.close()
+    widget.deleteLater()
+    app.processEvents()
+
+
+def main():
+    app = QApplication(sys.argv[:1])
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    # The old console slows down as it grows, so it gets fewer lines
+    legacy_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+
+    print(f"{'Console':<28} {'lines':>12} {'lines/s':>12} {'MB held':>10}")
+    console = OutputConsole()
+    run_case(app, "bounded, batched", console, console.write, lines, console.flush)
+    print(f"{'':<28} kept {console.blockCount():,} lines, dropped "
+          f"{console.dropped_lines:,} before display")
+
+    legacy = QTextEdit()
+    legacy.setReadOnly(True)
+    run_case(app, "QTextEdit.append", legacy, legacy.append, legacy_lines)
+
+
+if __name__ == "__main__":
+    main()
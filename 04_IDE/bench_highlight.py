@@ -0,0 +1,101 @@
+"""Time to highlight a large Python file with the single-pass highlighter
+against the original one-pattern-per-rule highlighter.
+
+Run with: python bench_highlight.py [file.py | number of lines]
+"""
+import sys
+import time
+from PyQt6.QtGui import (QGuiApplication, QTextDocument, QSyntaxHighlighter, QTextCharFormat,
+                         QColor, QFont)
+from PyQt6.QtCore import QRegularExpression
+import main as ide
+
+
+class LegacyHighlighter(QSyntaxHighlighter):
+    """The original highlighter, kept for comparison"""
+
+    def __init__(self, document):
+        super().__init__(document)
+        self.highlighting_rules = []
+        keyword_format = QTextCharFormat()
+        keyword_format.setForeground(QColor("#569CD6"))
+        keyword_format.setFontWeight(QFont.Weight.Bold)
+        for word in ide.KEYWORDS:
+            pattern = QRegularExpression(r'\b' + word + r'\b')
+            self.highlighting_rules.append((pattern, keyword_format))
+        function_format = QTextCharFormat()
+        function_format.setForeground(QColor("#DCDCAA"))
+        self.highlighting_rules.append((QRegularExpression(r'\b[A-Za-z0-9_]+(?=\()'), function_format))
+        string_format = QTextCharFormat()
+        string_format.setForeground(QColor("#CE9178"))
+        self.highlighting_rules.append((QRegularExpression(r'".*?"'), string_format))
+        self.highlighting_rules.append((QRegularExpression(r"'.*?'"), string_format))
+        comment_format = QTextCharFormat()
+        comment_format.setForeground(QColor("#6A9955"))
+        self.highlighting_rules.append((QRegularExpression(r'#.*$'), comment_format))
+        number_format = QTextCharFormat()
+        number_format.setForeground(QColor("#B5CEA8"))
+        self.highlighting_rules.append((QRegularExpression(r'\b\d+\b'), number_format))
+
+    def highlightBlock(self, text):
+        for pattern, format in self.highlighting_rules:
+            matches = pattern.globalMatch(text)
+            while matches.hasNext():
+                match = matches.next()
+                self.setFormat(match.capturedStart(), match.capturedLength(), format)
+
+
+SAMPLE = '''class Shape{n}(Base):
+    """A generated class, number {n}.
+
+    Docstrings span several lines, as in real modules.
+    """
+
+    def area(self, width, height={n}):
+        # Comments mention if, for and return
+        if width > 0 and height is not None:
+            return width * height + len("label {n}") - 0x1F
+        for item in range({n}):
+            yield item, 'text', f"{{item}}"
+        raise ValueError("bad size: %d" % width)
+
+'''
+
+
+def make_source(lines):
+    block = SAMPLE.count("\n")
+    return "".join(SAMPLE.format(n=n) for n in range(lines // block + 1))
+
+
+def highlight_seconds(highlighter_class, source):
+    document = QTextDocument()
+    document.setPlainText(source)
+    highlighter = highlighter_class(None)
+    start = time.perf_counter()
+    highlighter.setDocument(document)
+    # setDocument only schedules highlighting; rehighlight runs it now
+    highlighter.rehighlight()
+    return time.perf_counter() - start
+
+
+def main():
+    app = QGuiApplication(sys.argv[:1])
+    argument = sys.argv[1] if len(sys.argv) > 1 else "50000"
+    if argument.isdigit():
+        source = make_source(int(argument))
+    else:
+        with open(argument, "r", encoding="utf-8") as f:
+            source = f.read()
+    lines = source.count("\n") + 1
+
+    print(f"{'Highlighter':<14} {'seconds':>9} {'lines/s':>12}")
+    baseline = None
+    for name, highlighter_class in (("per rule", LegacyHighlighter),
+                                    ("single pass", ide.PythonHighlighter)):
+        seconds = highlight_seconds(highlighter_class, source)
+        baseline = baseline or seconds
+        print(f"{name:<14} {seconds:>9.2f} {lines / seconds:>12,.0f}   {baseline / seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
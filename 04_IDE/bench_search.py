@@ -0,0 +1,126 @@
+"""Time to first match and total time of find-in-files on a large tree,
+for a single-process scan and for the process pool, cold and warm.
+
+Run with: python bench_search.py [directory] [query]
+
+Without a directory, a tree of 50,000 small files is generated in the
+temporary directory on the first run and reused afterwards.
+"""
+import os
+import sys
+import tempfile
+import time
+from PyQt6.QtCore import QCoreApplication, QEventLoop, QThreadPool
+import find_in_files
+import search
+
+TREE_FILES = 50_000
+FILES_PER_DIRECTORY = 100
+
+
+def make_tree(root, files):
+    """Text files with a needle in every 97th, plus ignored and binary files"""
+    line = "    value = compute(index, offset) + total  # ordinary source line\n"
+    for i in range(files):
+        directory = os.path.join(root, f"package_{i // FILES_PER_DIRECTORY:04d}")
+        os.makedirs(directory, exist_ok=True)
+        text = line * 30
+        if i % 97 == 0:
+            text += "    needle_function(index)\n"
+        with open(os.path.join(directory, f"module_{i:05d}.py"), "w") as f:
+            f.write(text)
+    ignored = os.path.join(root, "build")
+    os.makedirs(ignored, exist_ok=True)
+    for i in range(1000):
+        with open(os.path.join(ignored, f"generated_{i}.py"), "w") as f:
+            f.write("needle_function()\n")
+    with open(os.path.join(root, "data.bin"), "wb") as f:
+        f.write(b"\0needle_function" * 1000)
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write("build/\n")
+
+
+def serial_search(directory, query):
+    regex = search.compile_query(query)
+    start = time.perf_counter()
+    first = None
+    files = matches = 0
+    for path in search.iter_files(directory):
+        found = search.search_file(path, regex)
+        files += 1
+        matches += len(found)
+        if found and first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start, files, matches
+
+
+def pool_search(panel, directory, query):
+    """Run one SearchTask the way the panel does"""
+    panel.generation += 1
+    task = find_in_files.SearchTask(panel.generation, panel.executor, panel.workers, directory,
+                                    query, False, False)
+    result = {"first": None, "matches": 0}
+    # Block in an event loop like the IDE does; spinning would take the
+    # CPU from the workers
+    loop = QEventLoop()
+    start = time.perf_counter()
+
+    def on_matches(generation, matches):
+        if result["first"] is None:
+            result["first"] = time.perf_counter() - start
+        result["matches"] += len(matches)
+
+    def on_finished(generation, files, limited):
+        result["total"] = time.perf_counter() - start
+        result["files"] = files
+        loop.quit()
+
+    task.signals.matches.connect(on_matches)
+    task.signals.finished.connect(on_finished)
+    QThreadPool.globalInstance().start(task)
+    loop.exec()
+    return result["first"], result["total"], result["files"], result["matches"]
+
+
+class Panel:
+    """Just the parts of FindInFilesPanel that SearchTask needs"""
+
+    def __init__(self):
+        self.workers = os.cpu_count() or 1
+        self.executor = None
+        self.generation = 0
+
+    start_workers = find_in_files.FindInFilesPanel.start_workers
+
+
+def main():
+    app = QCoreApplication(sys.argv[:1])  # needed for queued signals
+    if len(sys.argv) > 1:
+        directory = sys.argv[1]
+    else:
+        directory = os.path.join(tempfile.gettempdir(), "bench_search_tree")
+        if not os.path.exists(os.path.join(directory, ".gitignore")):
+            print(f"Creating {TREE_FILES:,} files in {directory}...")
+            make_tree(directory, TREE_FILES)
+    query = sys.argv[2] if len(sys.argv) > 2 else "needle_function"
+
+    print(f"{'Search':<26} {'first match ms':>15} {'total s':>9} {'files':>9} {'matches':>9}")
+    first, total, files, matches = serial_search(directory, query)
+    print(f"{'single process':<26} {first * 1000:>15.0f} {total:>9.2f} {files:>9,} {matches:>9,}")
+
+    panel = Panel()
+    start = time.perf_counter()
+    panel.start_workers()
+    # Waits for the warm-up task on every worker
+    panel.executor.submit(find_in_files.noop).result()
+    startup = time.perf_counter() - start
+    for name in ("process pool, first search", "process pool, warm"):
+        first, total, files, matches = pool_search(panel, directory, query)
+        print(f"{name:<26} {first * 1000:>15.0f} {total:>9.2f} {files:>9,} {matches:>9,}")
+    print(f"Starting {panel.workers} worker processes took {startup * 1000:.0f} ms, "
+          f"done when the panel is first shown")
+    panel.executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Output console for the IDE that stays fast and bounded under heavy output.
+
+Text written to the console is buffered and inserted into the document in
+one batch at most once per frame. Only the newest MAX_LINES lines are kept:
+the document drops its oldest blocks past that count, and output still
+waiting to be shown is trimmed the same way, so a script printing millions
+of lines costs a fixed amount of memory.
+"""
+from collections import deque
+from PyQt6.QtWidgets import QPlainTextEdit
+from PyQt6.QtGui import QFont, QTextCursor, QTextCharFormat
+from PyQt6.QtCore import QTimer
+
+# Lines kept in the console; older lines are dropped first
+MAX_LINES = 20000
+
+# Buffered output is flushed at most this often, about once per frame
+FLUSH_INTERVAL_MS = 16
+
+
+class OutputConsole(QPlainTextEdit):
+    """Read-only plain-text console; call write() with output as it arrives"""
+
+    def __init__(self, max_lines=MAX_LINES, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        # Undo history would keep every line ever shown
+        self.setUndoRedoEnabled(False)
+        self.setMaximumBlockCount(max_lines)
+        self.setFont(QFont("Courier New", 10))
+        self.max_lines = max_lines
+
+        # Pending output as [format, chunks, newline count] runs
+        self.pending = deque()
+        self.pending_lines = 0
+        self.dropped_lines = 0
+
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(FLUSH_INTERVAL_MS)
+        self.flush_timer.timeout.connect(self.flush)
+
+    def write(self, text, text_format=None):
+        """Queue text to be shown, in text_format or the default format"""
+        if not text:
+            return
+        lines = text.count("\n")
+        if self.pending and self.pending[-1][0] is text_format:
+            self.pending[-1][1].append(text)
+            self.pending[-1][2] += lines
+        else:
+            self.pending.append([text_format, [text], lines])
+        self.pending_lines += lines
+
+        # Trimming in steps keeps the cost per write constant
+        if self.pending_lines > 2 * self.max_lines:
+            self.trim_pending()
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def trim_pending(self):
+        """Drop the oldest pending lines beyond max_lines"""
+        excess = self.pending_lines - self.max_lines
+        while excess > 0 and self.pending:
+            run = self.pending[0]
+            if run[2] <= excess:
+                self.pending.popleft()
+                excess -= run[2]
+                self.pending_lines -= run[2]
+                self.dropped_lines += run[2]
+                continue
+            run[1] = ["".join(run[1]).split("\n", excess)[-1]]
+            run[2] -= excess
+            self.pending_lines -= excess
+            self.dropped_lines += excess
+            excess = 0
+
+    def flush(self):
+        """Insert all pending output at the end of the document"""
+        if not self.pending:
+            return
+        self.trim_pending()
+        scroll_bar = self.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum()
+
+        if self.pending_lines >= self.max_lines:
+            # Everything shown now would be pushed out; replace it outright
+            # rather than have the document drop its blocks one by one
+            super().clear()
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.beginEditBlock()
+        for text_format, chunks, _ in self.pending:
+            cursor.insertText("".join(chunks), text_format or QTextCharFormat())
+        cursor.endEditBlock()
+        self.pending.clear()
+        self.pending_lines = 0
+
+        # Follow new output unless the user has scrolled up to read
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
+
+    def clear(self):
+        self.flush_timer.stop()
+        self.pending.clear()
+        self.pending_lines = 0
+        self.dropped_lines = 0
+        super().clear()
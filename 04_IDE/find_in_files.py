@@ -0,0 +1,256 @@
+"""Find-in-files panel for the IDE.
+
+A SearchTask on the thread pool walks the directory tree and hands files
+to a pool of worker processes in batches as it finds them, so matches
+from the first files show up while the rest of the tree is still being
+walked. The first batches are small to get results on screen quickly;
+later ones are bigger to keep the overhead per file down. Starting a new
+search cancels the one in flight.
+"""
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QCheckBox,
+                             QPushButton, QTreeWidget, QTreeWidgetItem, QLabel, QFileDialog)
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+import search
+
+# Files per batch: the first batch, and the size batches double up to
+FIRST_BATCH_FILES = 16
+MAX_BATCH_FILES = 256
+
+# The search stops after this many matches
+MAX_MATCHES = 5000
+
+# Pause in typing before the query is searched for
+SEARCH_DEBOUNCE_MS = 300
+
+
+class SearchSignals(QObject):
+    """Signals emitted by SearchTask from the thread pool"""
+    matches = pyqtSignal(int, object)  # generation, [(path, line, column, text)]
+    finished = pyqtSignal(int, int, bool)  # generation, files searched, hit MAX_MATCHES
+    failed = pyqtSignal(int, str)
+
+
+class SearchTask(QRunnable):
+    """Searches the files under a directory on a process pool"""
+
+    def __init__(self, generation, executor, workers, directory, query, is_regex, case_sensitive):
+        super().__init__()
+        self.signals = SearchSignals()
+        self.generation = generation
+        self.executor = executor
+        self.max_in_flight = 2 * workers
+        self.directory = directory
+        self.query = (query, is_regex, case_sensitive)
+        self.cancel_requested = False
+        self.files = 0
+        self.match_count = 0
+
+    def collect(self, futures):
+        for future in futures:
+            files, matches = future.result()
+            self.files += files
+            if matches and not self.cancel_requested:
+                matches = matches[:MAX_MATCHES - self.match_count]
+                self.match_count += len(matches)
+                self.signals.matches.emit(self.generation, matches)
+
+    def run(self):
+        pending = set()
+        batch = []
+        batch_size = FIRST_BATCH_FILES
+        try:
+            for path in search.iter_files(self.directory):
+                if self.cancel_requested or self.match_count >= MAX_MATCHES:
+                    break
+                batch.append(path)
+                if len(batch) < batch_size:
+                    continue
+                pending.add(self.executor.submit(search.search_files, batch, *self.query))
+                batch = []
+                batch_size = min(2 * batch_size, MAX_BATCH_FILES)
+
+                # Report finished batches straight away, and wait only
+                # when enough are queued to keep the workers busy
+                done = {future for future in pending if future.done()}
+                if len(pending) - len(done) >= self.max_in_flight:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                pending -= done
+                self.collect(done)
+
+            if batch and not self.cancel_requested:
+                pending.add(self.executor.submit(search.search_files, batch, *self.query))
+            while pending and not self.cancel_requested and self.match_count < MAX_MATCHES:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                self.collect(done)
+        except Exception as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        finally:
+            # Batches not started yet are dropped; running ones are ignored
+            for future in pending:
+                future.cancel()
+        if not self.cancel_requested:
+            self.signals.finished.emit(self.generation, self.files,
+                                       self.match_count >= MAX_MATCHES)
+
+
+def noop():
+    pass
+
+
+class FindInFilesPanel(QWidget):
+    """Search box and streamed results; emits open_location on activation"""
+
+    open_location = pyqtSignal(str, int, int)  # path, line, column
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool()
+        self.workers = os.cpu_count() or 1
+        self.executor = None
+        self.directory = os.getcwd()
+        self.task = None
+        self.generation = 0
+        self.file_items = {}
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+
+        query_layout = QHBoxLayout()
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("Find in files")
+        self.query_edit.returnPressed.connect(self.start_search)
+        self.query_edit.textEdited.connect(lambda: self.search_timer.start())
+        query_layout.addWidget(self.query_edit)
+        self.regex_check = QCheckBox("Regex")
+        self.regex_check.toggled.connect(self.start_search)
+        query_layout.addWidget(self.regex_check)
+        self.case_check = QCheckBox("Case")
+        self.case_check.toggled.connect(self.start_search)
+        query_layout.addWidget(self.case_check)
+        layout.addLayout(query_layout)
+
+        directory_layout = QHBoxLayout()
+        self.directory_label = QLabel(self.directory)
+        directory_layout.addWidget(self.directory_label, 1)
+        folder_button = QPushButton("Folder...")
+        folder_button.clicked.connect(self.choose_directory)
+        directory_layout.addWidget(folder_button)
+        layout.addLayout(directory_layout)
+
+        self.results = QTreeWidget()
+        self.results.setHeaderHidden(True)
+        self.results.itemActivated.connect(self.on_item_activated)
+        layout.addWidget(self.results)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        # Search as the query is typed, once typing pauses
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.start_search)
+
+    def start_workers(self):
+        """Start the worker processes ahead of the first search"""
+        if self.executor is None:
+            # Forking a process with Qt threads running is not safe
+            self.executor = ProcessPoolExecutor(self.workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+            for _ in range(self.workers):
+                self.executor.submit(noop)
+
+    def set_directory(self, directory):
+        self.directory = directory
+        self.directory_label.setText(directory)
+
+    def choose_directory(self):
+        directory = QFileDialog.getExistingDirectory(self, "Search In", self.directory)
+        if directory:
+            self.set_directory(directory)
+            self.start_search()
+
+    def cancel_search(self):
+        if self.task is not None:
+            self.task.cancel_requested = True
+            self.task = None
+
+    def start_search(self):
+        """Search for the query, replacing any search in progress"""
+        self.search_timer.stop()
+        self.cancel_search()
+        self.generation += 1
+        self.results.clear()
+        self.file_items = {}
+        self.match_count = 0
+        query = self.query_edit.text()
+        if not query:
+            self.status_label.clear()
+            return
+        try:
+            search.compile_query(query, self.regex_check.isChecked(), self.case_check.isChecked())
+        except re.error as e:
+            self.status_label.setText(f"Invalid regex: {e}")
+            return
+
+        self.start_workers()
+        self.task = SearchTask(self.generation, self.executor, self.workers, self.directory, query,
+                               self.regex_check.isChecked(), self.case_check.isChecked())
+        self.task.signals.matches.connect(self.add_matches)
+        self.task.signals.finished.connect(self.on_search_finished)
+        self.task.signals.failed.connect(self.on_search_failed)
+        self.status_label.setText("Searching...")
+        self.thread_pool.start(self.task)
+
+    def add_matches(self, generation, matches):
+        if generation != self.generation:
+            return
+        for path, line, column, text in matches:
+            parent = self.file_items.get(path)
+            if parent is None:
+                parent = QTreeWidgetItem(self.results, [os.path.relpath(path, self.directory)])
+                parent.setData(0, Qt.ItemDataRole.UserRole, (path, 1, 0))
+                parent.setExpanded(True)
+                self.file_items[path] = parent
+            item = QTreeWidgetItem(parent, [f"{line}: {text.strip()}"])
+            item.setData(0, Qt.ItemDataRole.UserRole, (path, line, column))
+        self.match_count += len(matches)
+        self.status_label.setText(f"Searching... {self.match_count:,} matches "
+                                  f"in {len(self.file_items):,} files")
+
+    def on_search_finished(self, generation, files, limited):
+        if generation != self.generation:
+            return
+        self.task = None
+        text = f"{self.match_count:,} matches in {len(self.file_items):,} of {files:,} files"
+        if limited:
+            text += f" (stopped at {MAX_MATCHES:,})"
+        self.status_label.setText(text)
+
+    def on_search_failed(self, generation, error):
+        if generation != self.generation:
+            return
+        self.task = None
+        # A broken pool is replaced on the next search
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+        self.status_label.setText(f"Search failed: {error}")
+
+    def on_item_activated(self, item):
+        path, line, column = item.data(0, Qt.ItemDataRole.UserRole)
+        self.open_location.emit(path, line, column)
+
+    def shutdown(self):
+        """Stop searching and the worker processes; call before closing"""
+        self.cancel_search()
+        self.thread_pool.waitForDone()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
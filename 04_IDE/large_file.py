@@ -0,0 +1,342 @@
+"""Large-file mode for the IDE: view files too big to load into the editor.
+
+The file is memory-mapped and a pool thread indexes where each line
+starts, a chunk at a time, so the start of the file can be scrolled while
+the rest is still being indexed. Only the lines in view are decoded and
+put into the text widget, so memory use depends on the window size rather
+than on the file. Large files are shown read-only and without highlighting.
+"""
+import codecs
+import mmap
+import re
+import numpy as np
+from PyQt6.QtWidgets import QWidget, QPlainTextEdit, QScrollBar, QLabel, QGridLayout
+from PyQt6.QtGui import QFont, QTextCursor
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QEvent, pyqtSignal
+
+# Files bigger than this open in large-file mode
+LARGE_FILE_BYTES = 16 * 2**20
+
+# Bytes read to detect the encoding
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+# The first chunk is small so the top of the file shows at once; later
+# chunks double up to the largest size
+FIRST_INDEX_CHUNK_BYTES = 1 * 2**20
+INDEX_CHUNK_BYTES = 16 * 2**20
+
+# Longer lines are cut off in the view
+MAX_LINE_BYTES = 64 * 1024
+
+# Byte order marks, longest first: (mark, codec for the whole file,
+# codec for the bytes after the mark)
+BOMS = [
+    (codecs.BOM_UTF32_LE, "utf-32", "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32", "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8-sig", "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16", "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16", "utf-16-be"),
+]
+
+# PEP 263 encoding declaration, looked for in the first two lines
+CODING_PATTERN = re.compile(rb"^[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)")
+
+
+def detect_encoding(sample):
+    """Guess the encoding of a file from its first bytes.
+
+    Returns (file codec, body codec, BOM length): the file codec decodes
+    the whole file and the body codec decodes slices after the BOM.
+    """
+    for bom, file_codec, body_codec in BOMS:
+        if sample.startswith(bom):
+            return file_codec, body_codec, len(bom)
+
+    for line in sample.split(b"\n", 2)[:2]:
+        match = CODING_PATTERN.match(line)
+        if match:
+            try:
+                name = codecs.lookup(match.group(1).decode("ascii")).name
+                return name, name, 0
+            except LookupError:
+                break
+
+    try:
+        # Not final, so a character cut off at the end of the sample is fine
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8", "utf-8", 0
+    except UnicodeDecodeError:
+        # Every byte sequence is valid Latin-1
+        return "latin-1", "latin-1", 0
+
+
+def newline_dtype(codec):
+    """NumPy dtype of one code unit of codec, for finding newlines"""
+    if codec.startswith("utf-16"):
+        return np.dtype(">u2" if codec.endswith("be") else "<u2")
+    if codec.startswith("utf-32"):
+        return np.dtype(">u4" if codec.endswith("be") else "<u4")
+    return np.dtype(np.uint8)
+
+
+class LineIndexSignals(QObject):
+    """Signals emitted by LineIndexTask from the thread pool"""
+    progress = pyqtSignal(int, object, int)  # generation, line starts, bytes indexed
+    finished = pyqtSignal(int)
+    failed = pyqtSignal(int, str)
+
+
+class LineIndexTask(QRunnable):
+    """Finds the offset where each line of a file starts, chunk by chunk"""
+
+    def __init__(self, generation, path, dtype, start):
+        super().__init__()
+        self.signals = LineIndexSignals()
+        self.generation = generation
+        self.path = path
+        self.dtype = dtype
+        self.start = start
+        self.cancel_requested = False
+
+    def run(self):
+        unit = self.dtype.itemsize
+        try:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                position = self.start
+                chunk = FIRST_INDEX_CHUNK_BYTES
+                while position < len(mm):
+                    if self.cancel_requested:
+                        return
+                    count = min(len(mm) - position, chunk) // unit
+                    if count == 0:
+                        break
+                    units = np.frombuffer(mm, dtype=self.dtype, count=count, offset=position)
+                    starts = np.flatnonzero(units == 10) * unit + (position + unit)
+                    # The mmap can't be closed while an array still uses it
+                    del units
+                    position += count * unit
+                    self.signals.progress.emit(self.generation, starts, position)
+                    chunk = min(2 * chunk, INDEX_CHUNK_BYTES)
+        except (OSError, ValueError) as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.finished.emit(self.generation)
+
+
+class LargeFileView(QWidget):
+    """Read-only view of a memory-mapped file showing only the lines in view"""
+
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool()
+        self.path = None
+        self.mm = None
+        self.file = None
+        self.index_task = None
+        self.generation = 0
+        # (line, column) to go to once the index gets there
+        self.target = None
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QGridLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setUndoRedoEnabled(False)
+        self.text.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text.setFont(QFont("Courier New", 10))
+        # The widget only holds the window; this scroll bar covers the file
+        self.text.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.text.viewport().installEventFilter(self)
+        self.text.installEventFilter(self)
+        layout.addWidget(self.text, 0, 0)
+
+        self.scroll_bar = QScrollBar(Qt.Orientation.Vertical)
+        self.scroll_bar.valueChanged.connect(self.load_window)
+        layout.addWidget(self.scroll_bar, 0, 1)
+
+        self.position_label = QLabel()
+        layout.addWidget(self.position_label, 1, 0, 1, 2)
+
+    def open_file(self, path):
+        """Map path and start indexing it; raises OSError if it can't be read"""
+        self.close_file()
+        self.file = open(path, "rb")
+        try:
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            self.file.close()
+            self.file = None
+            raise
+        self.path = path
+        self.encoding, self.body_codec, bom_length = detect_encoding(
+            self.mm[:ENCODING_SAMPLE_BYTES])
+        self.line_starts = np.array([bom_length], dtype=np.int64)
+        self.indexed_bytes = bom_length
+        self.indexing = True
+        self.target = None
+
+        self.generation += 1
+        self.index_task = LineIndexTask(self.generation, path, newline_dtype(self.body_codec),
+                                        bom_length)
+        self.index_task.signals.progress.connect(self.on_index_progress)
+        self.index_task.signals.finished.connect(self.on_index_finished)
+        self.index_task.signals.failed.connect(self.on_index_failed)
+        self.thread_pool.start(self.index_task)
+
+        self.scroll_bar.setValue(0)
+        self.update_range()
+        self.load_window()
+
+    def close_file(self):
+        if self.index_task is not None:
+            self.index_task.cancel_requested = True
+            self.index_task = None
+        self.thread_pool.waitForDone()
+        self.text.clear()
+        if self.mm is not None:
+            self.mm.close()
+            self.file.close()
+        self.mm = None
+        self.file = None
+        self.path = None
+        self.target = None
+
+    def line_count(self):
+        """Lines known so far; the last one is only complete once indexed"""
+        return len(self.line_starts) if not self.indexing else len(self.line_starts) - 1
+
+    def visible_lines(self):
+        return max(1, self.text.viewport().height() // self.text.fontMetrics().lineSpacing())
+
+    def on_index_progress(self, generation, starts, indexed_bytes):
+        if generation != self.generation:
+            return
+        if len(starts):
+            self.line_starts = np.concatenate([self.line_starts, starts])
+        self.indexed_bytes = indexed_bytes
+        self.update_range()
+        # Fill the view as soon as its lines are known
+        if self.text.blockCount() < self.visible_lines():
+            self.load_window()
+        if self.target is not None and self.target[0] <= self.line_count():
+            self.go_to_line(*self.target)
+
+    def on_index_finished(self, generation):
+        if generation != self.generation:
+            return
+        self.indexing = False
+        # A trailing newline doesn't start another line
+        if len(self.line_starts) > 1 and self.line_starts[-1] >= len(self.mm):
+            self.line_starts = self.line_starts[:-1]
+        self.index_task = None
+        self.update_range()
+        # Same lines as before, so the cursor stays where it was
+        cursor = self.text.textCursor()
+        row, column = cursor.blockNumber(), cursor.positionInBlock()
+        self.load_window()
+        self.place_cursor(row, column)
+        if self.target is not None:
+            self.go_to_line(*self.target)
+
+    def on_index_failed(self, generation, error):
+        if generation == self.generation:
+            self.indexing = False
+            self.index_task = None
+            self.failed.emit(error)
+
+    def go_to_line(self, line, column=0):
+        """Scroll to line and put the cursor at column; a line the index
+        hasn't reached yet is gone to once it has"""
+        if self.mm is None:
+            return
+        if self.indexing and line > self.line_count():
+            self.target = (line, column)
+            return
+        self.target = None
+        index = max(0, min(line, self.line_count()) - 1)
+        # Centred, as the editor does
+        self.scroll_bar.setValue(index - self.visible_lines() // 2)
+        self.place_cursor(index - self.scroll_bar.value(), column)
+        self.text.setFocus()
+
+    def place_cursor(self, row, column):
+        """Put the cursor at column of a row of the window"""
+        block = self.text.document().findBlockByNumber(row)
+        if block.isValid():
+            cursor = QTextCursor(block)
+            cursor.movePosition(QTextCursor.MoveOperation.Right, n=min(column, block.length() - 1))
+            self.text.setTextCursor(cursor)
+
+    def update_range(self):
+        visible = self.visible_lines()
+        self.scroll_bar.setRange(0, max(0, self.line_count() - visible))
+        self.scroll_bar.setPageStep(visible)
+        self.update_label()
+
+    def update_label(self):
+        first = self.scroll_bar.value()
+        last = min(self.line_count(), first + self.visible_lines())
+        text = f"Lines {first + 1:,}-{last:,} of {self.line_count():,}"
+        if self.indexing and self.mm is not None:
+            text += f" (indexing, {100 * self.indexed_bytes / max(1, len(self.mm)):.0f}%)"
+        self.position_label.setText(text)
+
+    def load_window(self):
+        """Decode the lines in view and show them"""
+        if self.mm is None:
+            return
+        first = self.scroll_bar.value()
+        last = min(self.line_count(), first + self.visible_lines() + 1)
+        lines = []
+        for index in range(first, last):
+            start = int(self.line_starts[index])
+            end = int(self.line_starts[index + 1]) if index + 1 < len(self.line_starts) else len(self.mm)
+            data = self.mm[start:min(end, start + MAX_LINE_BYTES)]
+            line = data.decode(self.body_codec, errors="replace").rstrip("\r\n")
+            if end - start > MAX_LINE_BYTES:
+                line += f" [... {end - start - MAX_LINE_BYTES:,} more bytes]"
+            lines.append(line)
+
+        # Keep the horizontal position while scrolling through the file
+        horizontal = self.text.horizontalScrollBar().value()
+        self.text.setPlainText("\n".join(lines))
+        self.text.horizontalScrollBar().setValue(horizontal)
+        self.update_label()
+
+    def eventFilter(self, obj, event):
+        # Wheel and paging keys move through the file rather than the window
+        if event.type() == QEvent.Type.Wheel and obj is self.text.viewport():
+            steps = event.angleDelta().y() // 40
+            if steps:
+                self.scroll_bar.setValue(self.scroll_bar.value() - steps)
+                return True
+        elif event.type() == QEvent.Type.KeyPress and obj is self.text:
+            moves = {
+                Qt.Key.Key_Up: -1,
+                Qt.Key.Key_Down: 1,
+                Qt.Key.Key_PageUp: -self.visible_lines(),
+                Qt.Key.Key_PageDown: self.visible_lines(),
+            }
+            if event.key() in moves:
+                self.scroll_bar.setValue(self.scroll_bar.value() + moves[event.key()])
+                return True
+            if event.modifiers() & Qt.KeyboardModifier.ControlModifier:
+                if event.key() == Qt.Key.Key_Home:
+                    self.scroll_bar.setValue(0)
+                    return True
+                if event.key() == Qt.Key.Key_End:
+                    self.scroll_bar.setValue(self.scroll_bar.maximum())
+                    return True
+        return super().eventFilter(obj, event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.mm is not None:
+            self.update_range()
+            self.load_window()
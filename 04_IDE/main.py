@@ -1,63 +1,151 @@
 import sys
 import os
-import subprocess
-from PyQt6.QtWidgets import (QApplication, QMainWindow, QTextEdit, QVBoxLayout, 
+import codecs
+import re
+import time
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, 
                            QWidget, QToolBar, QStatusBar, QFileDialog, 
-                           QMessageBox, QSplitter, QPlainTextEdit)
-from PyQt6.QtGui import QAction, QFont, QKeySequence, QColor, QTextCharFormat, QSyntaxHighlighter
-from PyQt6.QtCore import Qt, QRegularExpression
+                           QMessageBox, QSplitter, QPlainTextEdit, QSpinBox, QLabel,
+                           QStackedWidget, QDockWidget, QTreeWidget, QTreeWidgetItem)
+from PyQt6.QtGui import (QAction, QFont, QKeySequence, QColor, QTextCharFormat, QSyntaxHighlighter,
+                         QTextCursor)
+from PyQt6.QtCore import Qt, QProcess, QProcessEnvironment, QTimer, QThreadPool
+from console import OutputConsole
+from large_file import LargeFileView, LARGE_FILE_BYTES, ENCODING_SAMPLE_BYTES, detect_encoding
+from outline import OutlineCache, OutlineTask, ProjectIndexTask
+from find_in_files import FindInFilesPanel
+
+# Default limit on a run's wall-clock time in seconds; 0 means no limit
+DEFAULT_RUN_TIMEOUT = 60
+
+# How often the running script's memory use is sampled
+MEMORY_POLL_MS = 100
+
+# Time a stopped script gets to exit before it is killed
+STOP_GRACE_MS = 2000
+
+# Files bigger than this are shown without syntax highlighting
+HIGHLIGHT_LIMIT_BYTES = 2 * 2**20
+
+# Pause in typing before the outline is parsed again
+OUTLINE_DEBOUNCE_MS = 400
+
+# Python keywords, highlighted wherever they appear as whole words
+KEYWORDS = [
+    "and", "as", "assert", "break", "class", "continue", "def", "del",
+    "elif", "else", "except", "False", "finally", "for", "from", "global",
+    "if", "import", "in", "is", "lambda", "None", "nonlocal", "not", "or",
+    "pass", "raise", "return", "True", "try", "while", "with", "yield"
+]
+
+# Every token kind in one alternation, so each line is scanned once.
+# Earlier alternatives win, so a # or keyword inside a string stays a string.
+TOKEN_PATTERN = re.compile(r"""
+    (?P<comment>\#.*)
+  | (?P<string>(?:\b[rRbBuUfF]{1,2})?
+        (?: (?P<delimiter>\"\"\"|\'\'\') (?:\\.|.)*? (?:(?P<close>(?P=delimiter))|$)
+          | "(?:\\.|[^"\\])*"
+          | '(?:\\.|[^'\\])*' ))
+  | (?P<keyword>\b(?:""" + "|".join(KEYWORDS) + r""")\b)
+  | (?P<function>\b\w+(?=\())
+  | (?P<number>\b\d+\b)
+""", re.VERBOSE)
+
+# Block states: the triple quote a block ends inside of, if any
+OUTSIDE_STRING = 0
+BLOCK_STATES = {'"""': 1, "'''": 2}
+
+# Pattern matching up to and including the closing quote, per block state
+STRING_END_PATTERNS = {state: re.compile(r"(?:\\.|.)*?" + delimiter)
+                       for delimiter, state in BLOCK_STATES.items()}
+
+# Characters outside the BMP take two UTF-16 units in Qt's positions
+ASTRAL_PATTERN = re.compile("[\U00010000-\U0010FFFF]")
+
+
+def make_format(color, bold=False):
+    text_format = QTextCharFormat()
+    text_format.setForeground(QColor(color))
+    if bold:
+        text_format.setFontWeight(QFont.Weight.Bold)
+    return text_format
+
 
 class PythonHighlighter(QSyntaxHighlighter):
     def __init__(self, document):
         super().__init__(document)
-        self.highlighting_rules = []
-        
-        # Keywords
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor("#569CD6"))
-        keyword_format.setFontWeight(QFont.Weight.Bold)
-        keywords = [
-            "and", "as", "assert", "break", "class", "continue", "def", "del",
-            "elif", "else", "except", "False", "finally", "for", "from", "global",
-            "if", "import", "in", "is", "lambda", "None", "nonlocal", "not", "or",
-            "pass", "raise", "return", "True", "try", "while", "with", "yield"
-        ]
-        for word in keywords:
-            pattern = QRegularExpression(r'\b' + word + r'\b')
-            self.highlighting_rules.append((pattern, keyword_format))
-        
-        # Functions
-        function_format = QTextCharFormat()
-        function_format.setForeground(QColor("#DCDCAA"))
-        pattern = QRegularExpression(r'\b[A-Za-z0-9_]+(?=\()')
-        self.highlighting_rules.append((pattern, function_format))
-        
-        # String literals
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor("#CE9178"))
-        pattern = QRegularExpression(r'".*?"')
-        self.highlighting_rules.append((pattern, string_format))
-        pattern = QRegularExpression(r"'.*?'")
-        self.highlighting_rules.append((pattern, string_format))
-        
-        # Comments
-        comment_format = QTextCharFormat()
-        comment_format.setForeground(QColor("#6A9955"))
-        pattern = QRegularExpression(r'#.*$')
-        self.highlighting_rules.append((pattern, comment_format))
-        
-        # Numbers
-        number_format = QTextCharFormat()
-        number_format.setForeground(QColor("#B5CEA8"))
-        pattern = QRegularExpression(r'\b\d+\b')
-        self.highlighting_rules.append((pattern, number_format))
+        # Format for each named group of TOKEN_PATTERN
+        self.formats = {
+            "keyword": make_format("#569CD6", bold=True),
+            "function": make_format("#DCDCAA"),
+            "string": make_format("#CE9178"),
+            "comment": make_format("#6A9955"),
+            "number": make_format("#B5CEA8"),
+        }
 
     def highlightBlock(self, text):
-        for pattern, format in self.highlighting_rules:
-            matches = pattern.globalMatch(text)
-            while matches.hasNext():
-                match = matches.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), format)
+        # Qt counts positions in UTF-16 units and Python in code points
+        if ASTRAL_PATTERN.search(text):
+            units = [0]
+            for char in text:
+                units.append(units[-1] + (2 if ord(char) > 0xFFFF else 1))
+            set_format = lambda start, end, text_format: self.setFormat(
+                units[start], units[end] - units[start], text_format)
+        else:
+            set_format = lambda start, end, text_format: self.setFormat(
+                start, end - start, text_format)
+        
+        self.setCurrentBlockState(OUTSIDE_STRING)
+        position = 0
+        
+        # Continue a triple-quoted string from the previous block
+        state = self.previousBlockState()
+        if state in STRING_END_PATTERNS:
+            match = STRING_END_PATTERNS[state].match(text)
+            if match is None:
+                set_format(0, len(text), self.formats["string"])
+                self.setCurrentBlockState(state)
+                return
+            position = match.end()
+            set_format(0, position, self.formats["string"])
+        
+        for match in TOKEN_PATTERN.finditer(text, position):
+            kind = match.lastgroup
+            set_format(match.start(), match.end(), self.formats[kind])
+            if kind == "string" and match.group("delimiter") and match.group("close") is None:
+                # An unterminated triple quote runs on into the next block
+                self.setCurrentBlockState(BLOCK_STATES[match.group("delimiter")])
+
+
+def read_peak_memory(pid):
+    """Peak resident memory of a running process in bytes, or None where
+    /proc is not available"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def read_rusage_peak_memory(children=False):
+    """Peak resident memory of the IDE, or the largest of any finished
+    child process, in bytes; None where the resource module is not
+    available. On Linux a child's peak includes the IDE's own, since it
+    starts as a copy of the IDE."""
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
 
 
 class CodeEditor(QPlainTextEdit):
@@ -73,11 +161,26 @@ class CodeEditor(QPlainTextEdit):
         # Apply syntax highlighter
         self.highlighter = PythonHighlighter(self.document())
 
+    def set_highlighting(self, enabled):
+        # Reattaching would highlight the whole document again
+        if enabled != (self.highlighter.document() is not None):
+            self.highlighter.setDocument(self.document() if enabled else None)
+
 
 class SimpleIDE(QMainWindow):
     def __init__(self):
         super().__init__()
         self.current_file = None
+        self.file_encoding = "utf-8"
+        self.process = None
+        self.thread_pool = QThreadPool()
+        # Outline of the editor text and definitions of the whole directory
+        self.definitions = []
+        self.outline_generation = 0
+        self.project_index = {}
+        self.outline_cache = None
+        self.index_task = None
+        self.index_generation = 0
         self.init_ui()
 
     def init_ui(self):
@@ -88,18 +191,31 @@ class SimpleIDE(QMainWindow):
         # Create splitter for editor and output
         splitter = QSplitter(Qt.Orientation.Vertical)
         
-        # Create code editor
+        # Create code editor, with a read-only view for large files in its place
         self.editor = CodeEditor()
-        splitter.addWidget(self.editor)
+        self.large_view = LargeFileView()
+        self.large_view.failed.connect(
+            lambda error: QMessageBox.critical(self, "Error", f"Failed to index file: {error}"))
+        self.editor_stack = QStackedWidget()
+        self.editor_stack.addWidget(self.editor)
+        self.editor_stack.addWidget(self.large_view)
+        splitter.addWidget(self.editor_stack)
         
         # Create output console
-        self.output_console = QTextEdit()
-        self.output_console.setReadOnly(True)
-        self.output_console.setFont(QFont("Courier New", 10))
+        # Batches output and keeps only the newest lines
+        self.output_console = OutputConsole()
         self.output_console.setStyleSheet("background-color: #1E1E1E; color: white;")
         self.output_console.setMinimumHeight(100)
         splitter.addWidget(self.output_console)
         
+        # Timers of the running script, restarted by each run
+        self.memory_timer = QTimer(self)
+        self.memory_timer.setInterval(MEMORY_POLL_MS)
+        self.memory_timer.timeout.connect(self.sample_memory)
+        self.timeout_timer = QTimer(self)
+        self.timeout_timer.setSingleShot(True)
+        self.timeout_timer.timeout.connect(self.on_timeout)
+        
         # Set splitter sizes (70% editor, 30% output)
         splitter.setSizes([700, 300])
         
@@ -112,11 +228,43 @@ class SimpleIDE(QMainWindow):
         # Create menu
         self.create_menu()
         
+        # Create outline and find in files docks
+        self.create_outline_dock()
+        self.create_find_dock()
+        
         # Create status bar
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
         self.statusBar.showMessage("Ready")
 
+    def create_outline_dock(self):
+        self.outline_tree = QTreeWidget()
+        self.outline_tree.setHeaderHidden(True)
+        self.outline_tree.itemActivated.connect(self.on_outline_item)
+        self.outline_tree.itemClicked.connect(self.on_outline_item)
+        self.outline_dock = QDockWidget("Outline", self)
+        self.outline_dock.setWidget(self.outline_tree)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.outline_dock)
+        
+        # Parse once typing pauses rather than on every keystroke
+        self.outline_timer = QTimer(self)
+        self.outline_timer.setSingleShot(True)
+        self.outline_timer.setInterval(OUTLINE_DEBOUNCE_MS)
+        self.outline_timer.timeout.connect(self.update_outline)
+        self.editor.textChanged.connect(self.outline_timer.start)
+
+    def create_find_dock(self):
+        self.find_panel = FindInFilesPanel()
+        self.find_panel.open_location.connect(self.open_location)
+        self.find_dock = QDockWidget("Find in Files", self)
+        self.find_dock.setWidget(self.find_panel)
+        # Worker processes start when the panel is first shown
+        self.find_dock.visibilityChanged.connect(
+            lambda visible: visible and self.find_panel.start_workers())
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.find_dock)
+        self.tabifyDockWidget(self.outline_dock, self.find_dock)
+        self.outline_dock.raise_()
+
     def create_menu(self):
         # Create menu bar
         menubar = self.menuBar()
@@ -191,6 +339,20 @@ class SimpleIDE(QMainWindow):
         paste_action.triggered.connect(self.editor.paste)
         edit_menu.addAction(paste_action)
         
+        edit_menu.addSeparator()
+        
+        # Go to definition action
+        definition_action = QAction("Go to &Definition", self)
+        definition_action.setShortcut("F12")
+        definition_action.triggered.connect(self.go_to_definition)
+        edit_menu.addAction(definition_action)
+        
+        # Find in files action
+        find_action = QAction("&Find in Files", self)
+        find_action.setShortcut("Ctrl+Shift+F")
+        find_action.triggered.connect(self.show_find_in_files)
+        edit_menu.addAction(find_action)
+        
         # Run menu
         run_menu = menubar.addMenu("&Run")
         
@@ -199,6 +361,10 @@ class SimpleIDE(QMainWindow):
         run_action.setShortcut("F5")
         run_action.triggered.connect(self.run_code)
         run_menu.addAction(run_action)
+        self.run_actions.append(run_action)
+        
+        # Stop action
+        run_menu.addAction(self.stop_action)
 
     def create_toolbar(self):
         # Create toolbar
@@ -226,11 +392,29 @@ class SimpleIDE(QMainWindow):
         run_action = QAction("Run", self)
         run_action.triggered.connect(self.run_code)
         toolbar.addAction(run_action)
+        self.run_actions = [run_action]
+        
+        # Stop action, enabled while a script runs
+        self.stop_action = QAction("Stop", self)
+        self.stop_action.setShortcut("Shift+F5")
+        self.stop_action.setEnabled(False)
+        self.stop_action.triggered.connect(self.stop_code)
+        toolbar.addAction(self.stop_action)
+        
+        # Per-run time limit
+        toolbar.addWidget(QLabel(" Timeout (s): "))
+        self.timeout_spin = QSpinBox()
+        self.timeout_spin.setRange(0, 24 * 3600)
+        self.timeout_spin.setValue(DEFAULT_RUN_TIMEOUT)
+        self.timeout_spin.setSpecialValueText("None")
+        toolbar.addWidget(self.timeout_spin)
 
     def new_file(self):
         if self.maybe_save():
+            self.show_editor()
             self.editor.clear()
             self.current_file = None
+            self.file_encoding = "utf-8"
             self.setWindowTitle("Simple IDE - [New File]")
             self.statusBar.showMessage("New file created")
 
@@ -240,14 +424,44 @@ class SimpleIDE(QMainWindow):
                 self, "Open File", "", "Python Files (*.py);;All Files (*)"
             )
             if file_path:
-                try:
-                    with open(file_path, 'r') as f:
-                        self.editor.setPlainText(f.read())
-                    self.current_file = file_path
-                    self.setWindowTitle(f"Simple IDE - {os.path.basename(file_path)}")
-                    self.statusBar.showMessage(f"Opened {file_path}")
-                except Exception as e:
-                    QMessageBox.critical(self, "Error", f"Failed to open file: {str(e)}")
+                self.load_file(file_path)
+
+    def load_file(self, file_path):
+        try:
+            size = os.path.getsize(file_path)
+            if size > LARGE_FILE_BYTES:
+                self.open_large_file(file_path)
+            else:
+                with open(file_path, 'rb') as f:
+                    encoding = detect_encoding(f.read(ENCODING_SAMPLE_BYTES))[0]
+                with open(file_path, 'r', encoding=encoding, errors='replace') as f:
+                    text = f.read()
+                self.show_editor()
+                self.editor.set_highlighting(size <= HIGHLIGHT_LIMIT_BYTES)
+                self.editor.setPlainText(text)
+                self.file_encoding = encoding
+            self.current_file = file_path
+            self.setWindowTitle(f"Simple IDE - {os.path.basename(file_path)}")
+            self.statusBar.showMessage(f"Opened {file_path}")
+            self.find_panel.set_directory(os.path.dirname(os.path.abspath(file_path)))
+            self.index_project()
+            return True
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to open file: {str(e)}")
+            return False
+
+    def open_large_file(self, file_path):
+        """Show file_path memory-mapped and read-only instead of loading it"""
+        self.large_view.open_file(file_path)
+        self.editor.clear()
+        self.editor.document().setModified(False)
+        self.editor_stack.setCurrentWidget(self.large_view)
+        self.file_encoding = self.large_view.encoding
+
+    def show_editor(self):
+        if self.editor_stack.currentWidget() is self.large_view:
+            self.large_view.close_file()
+            self.editor_stack.setCurrentWidget(self.editor)
 
     def save_file(self):
         if self.current_file:
@@ -263,12 +477,18 @@ class SimpleIDE(QMainWindow):
         return False
 
     def save_to_file(self, file_path):
+        if self.editor_stack.currentWidget() is self.large_view:
+            self.statusBar.showMessage("Large files are opened read-only")
+            return False
         try:
-            with open(file_path, 'w') as f:
+            # Written back in the encoding it was read with
+            with open(file_path, 'w', encoding=self.file_encoding) as f:
                 f.write(self.editor.toPlainText())
+            self.editor.document().setModified(False)
             self.current_file = file_path
             self.setWindowTitle(f"Simple IDE - {os.path.basename(file_path)}")
             self.statusBar.showMessage(f"Saved to {file_path}")
+            self.index_project()
             return True
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save file: {str(e)}")
@@ -292,7 +512,116 @@ class SimpleIDE(QMainWindow):
             return False
         return True
 
+    def update_outline(self):
+        """Parse the editor's text on the thread pool"""
+        self.outline_generation += 1
+        if self.current_file is not None and not self.current_file.endswith(".py"):
+            self.definitions = []
+            self.outline_tree.clear()
+            return
+        task = OutlineTask(self.outline_generation, self.editor.toPlainText())
+        task.signals.parsed.connect(self.show_outline)
+        task.signals.failed.connect(self.on_outline_failed)
+        self.thread_pool.start(task)
+
+    def show_outline(self, generation, definitions):
+        if generation != self.outline_generation:
+            return
+        self.definitions = definitions
+        self.outline_tree.clear()
+        # Items by depth; each definition goes under the last one above it
+        parents = [self.outline_tree.invisibleRootItem()]
+        for kind, name, line, column, depth in definitions:
+            del parents[depth + 1:]
+            item = QTreeWidgetItem(parents[-1], [f"{kind} {name}"])
+            item.setData(0, Qt.ItemDataRole.UserRole, (line, column))
+            item.setToolTip(0, f"Line {line}")
+            parents.append(item)
+        self.outline_tree.expandAll()
+
+    def on_outline_failed(self, generation, error):
+        # Keep the last good outline while the code doesn't parse
+        if generation == self.outline_generation:
+            self.statusBar.showMessage(f"Outline not updated: {error}")
+
+    def on_outline_item(self, item):
+        line, column = item.data(0, Qt.ItemDataRole.UserRole)
+        self.go_to_line(line, column)
+
+    def go_to_line(self, line, column=0):
+        if self.editor_stack.currentWidget() is self.large_view:
+            self.large_view.go_to_line(line, column)
+            return
+        block = self.editor.document().findBlockByNumber(line - 1)
+        if not block.isValid():
+            return
+        cursor = QTextCursor(block)
+        cursor.movePosition(QTextCursor.MoveOperation.Right, n=min(column, block.length() - 1))
+        self.editor.setTextCursor(cursor)
+        self.editor.centerCursor()
+        self.editor.setFocus()
+
+    def index_project(self):
+        """Collect definitions from the Python files around the current file"""
+        if self.current_file is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.current_file))
+        if self.index_task is not None:
+            self.index_task.cancel_requested = True
+        if self.outline_cache is None or self.outline_cache.directory != directory:
+            self.outline_cache = OutlineCache(directory)
+        self.index_generation += 1
+        self.index_task = ProjectIndexTask(self.index_generation, self.outline_cache)
+        self.index_task.signals.indexed.connect(self.on_project_indexed)
+        self.index_task.signals.failed.connect(
+            lambda generation, error: self.statusBar.showMessage(error))
+        self.thread_pool.start(self.index_task)
+
+    def on_project_indexed(self, generation, index):
+        if generation != self.index_generation:
+            return
+        self.project_index = index
+        self.index_task = None
+
+    def go_to_definition(self):
+        """Jump to where the name under the cursor is defined"""
+        cursor = self.editor.textCursor()
+        cursor.select(QTextCursor.SelectionType.WordUnderCursor)
+        name = cursor.selectedText()
+        if not name:
+            return
+        
+        # The editor's own text first, as it may not be saved yet
+        for kind, definition_name, line, column, depth in self.definitions:
+            if definition_name == name:
+                self.go_to_line(line, column)
+                return
+        
+        current = os.path.abspath(self.current_file) if self.current_file else None
+        locations = [location for location in self.project_index.get(name, [])
+                     if location[0] != current]
+        if not locations:
+            self.statusBar.showMessage(f"No definition found for {name}")
+            return
+        self.open_location(*locations[0])
+
+    def show_find_in_files(self):
+        self.find_dock.show()
+        self.find_dock.raise_()
+        self.find_panel.query_edit.setFocus()
+        self.find_panel.query_edit.selectAll()
+
+    def open_location(self, path, line, column):
+        """Show path at line, opening it first if it isn't the current file"""
+        current = os.path.abspath(self.current_file) if self.current_file else None
+        if os.path.abspath(path) != current:
+            if not self.maybe_save() or not self.load_file(path):
+                return
+        self.go_to_line(line, column)
+
     def run_code(self):
+        if self.process is not None:
+            return
         if self.current_file is None:
             if not self.save_file():
                 return
@@ -300,34 +629,131 @@ class SimpleIDE(QMainWindow):
             self.save_file()
         
         self.output_console.clear()
-        self.output_console.append(f"Running: {self.current_file}\n")
+        self.output_console.write(f"Running: {self.current_file}\n\n")
+        
+        # Run the script without blocking; output is shown as it arrives
+        self.process = QProcess(self)
+        environment = QProcessEnvironment.systemEnvironment()
+        # Unbuffered so prints reach the console straight away
+        environment.insert("PYTHONUNBUFFERED", "1")
+        environment.insert("PYTHONIOENCODING", "utf-8")
+        self.process.setProcessEnvironment(environment)
+        self.process.readyReadStandardOutput.connect(self.read_stdout)
+        self.process.readyReadStandardError.connect(self.read_stderr)
+        self.process.finished.connect(self.on_process_finished)
+        self.process.errorOccurred.connect(self.on_process_error)
+        
+        # A chunk may end partway through a UTF-8 character
+        self.stdout_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.stderr_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.error_format = QTextCharFormat()
+        self.error_format.setForeground(QColor("#F48771"))
+        self.timed_out = False
+        self.peak_memory = None
+        # Only a peak above this one can come from this run
+        self.children_peak_before = read_rusage_peak_memory(children=True)
+        
+        self.set_running(True)
+        self.run_started = time.perf_counter()
+        self.process.start(sys.executable, [self.current_file])
+        self.memory_timer.start()
+        if self.timeout_spin.value():
+            self.timeout_timer.start(self.timeout_spin.value() * 1000)
+        self.statusBar.showMessage(f"Running {os.path.basename(self.current_file)}...")
+
+    def set_running(self, running):
+        for action in self.run_actions:
+            action.setEnabled(not running)
+        self.stop_action.setEnabled(running)
+
+    def read_stdout(self):
+        data = bytes(self.process.readAllStandardOutput())
+        self.output_console.write(self.stdout_decoder.decode(data))
+
+    def read_stderr(self):
+        data = bytes(self.process.readAllStandardError())
+        self.output_console.write(self.stderr_decoder.decode(data), self.error_format)
+
+    def sample_memory(self):
+        pid = self.process.processId()
+        peak = read_peak_memory(pid) if pid else None
+        if peak is not None:
+            self.peak_memory = max(peak, self.peak_memory or 0)
+
+    def stop_code(self):
+        """Ask the running script to stop, killing it if it doesn't"""
+        if self.process is None:
+            return
+        process = self.process
+        process.terminate()
+        QTimer.singleShot(STOP_GRACE_MS, lambda: self.kill_process(process))
+
+    def kill_process(self, process):
+        # Only if that run is still going; a finished one has been deleted
+        if self.process is process:
+            process.kill()
+
+    def on_timeout(self):
+        self.timed_out = True
+        self.stop_code()
+
+    def on_process_finished(self, exit_code, exit_status):
+        elapsed = time.perf_counter() - self.run_started
+        self.memory_timer.stop()
+        self.timeout_timer.stop()
+        # Output still buffered when the process ended
+        self.read_stdout()
+        self.read_stderr()
+        
+        # The process has been reaped, so its peak is counted among the
+        # children's; that catches runs too short for the timer as long as
+        # they went above every earlier run and the IDE itself
+        children_peak = read_rusage_peak_memory(children=True)
+        if children_peak is not None:
+            if children_peak > max(self.children_peak_before, read_rusage_peak_memory()):
+                self.peak_memory = max(children_peak, self.peak_memory or 0)
+        
+        if self.timed_out:
+            self.output_console.write(f"\n--- Stopped after the {self.timeout_spin.value()} s timeout ---")
+        elif exit_status == QProcess.ExitStatus.CrashExit:
+            self.output_console.write("\n--- Process was stopped ---")
+        else:
+            self.output_console.write(f"\n--- Process completed with exit code {exit_code} ---")
         
-        try:
-            # Run the Python script and capture output
-            result = subprocess.run(
-                [sys.executable, self.current_file],
-                capture_output=True,
-                text=True
-            )
-            
-            # Display stdout
-            if result.stdout:
-                self.output_console.append("--- Output ---\n")
-                self.output_console.append(result.stdout)
-            
-            # Display stderr
-            if result.stderr:
-                self.output_console.append("--- Errors ---\n")
-                self.output_console.append(result.stderr)
-                
-            # Show exit code
-            self.output_console.append(f"\n--- Process completed with exit code {result.returncode} ---")
-            
-        except Exception as e:
-            self.output_console.append(f"Error executing script: {str(e)}")
+        if self.peak_memory is not None:
+            memory = f"{self.peak_memory / 2**20:.1f} MB"
+        elif children_peak is not None:
+            # Too short and small to measure, but no more than this
+            memory = f"under {children_peak / 2**20:.0f} MB"
+        else:
+            memory = "n/a"
+        self.statusBar.showMessage(f"Finished in {elapsed:.2f} s, peak memory {memory}")
+        self.process.deleteLater()
+        self.process = None
+        self.set_running(False)
+
+    def on_process_error(self, error):
+        if error != QProcess.ProcessError.FailedToStart:
+            # Crashes and stops are reported by on_process_finished
+            return
+        self.output_console.write(f"Error executing script: {self.process.errorString()}")
+        self.memory_timer.stop()
+        self.timeout_timer.stop()
+        self.statusBar.showMessage("Failed to start")
+        self.process.deleteLater()
+        self.process = None
+        self.set_running(False)
 
     def closeEvent(self, event):
         if self.maybe_save():
+            if self.process is not None:
+                self.process.kill()
+                self.process.waitForFinished()
+            self.large_view.close_file()
+            if self.index_task is not None:
+                self.index_task.cancel_requested = True
+            self.thread_pool.waitForDone()
+            self.find_panel.shutdown()
             event.accept()
         else:
             event.ignore()
@@ -0,0 +1,214 @@
+"""Outline and go-to-definition support for the IDE.
+
+Classes and functions are found with the ast module on pool threads.
+Results for the files of a project are cached on disk by path. A file
+whose mtime and size are unchanged is not read at all, and one that was
+only touched is recognised by its content hash, so reopening a project
+only parses the files whose content actually changed.
+"""
+import ast
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import threading
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "simple_ide", "outline")
+
+# Bumped whenever the cached data changes shape
+CACHE_VERSION = 2
+
+# Directories never searched for definitions
+SKIP_DIRECTORIES = {"__pycache__", "node_modules", "venv", "env", "build", "dist"}
+
+# Projects with more files are only indexed up to this many
+MAX_PROJECT_FILES = 5000
+
+
+def parse_definitions(source, filename="<unknown>"):
+    """Classes and functions in source, in file order, as
+    (kind, name, line, column, depth) tuples; raises SyntaxError"""
+    if isinstance(source, bytes):
+        # Honours a coding declaration, as ast.parse does for bytes
+        source = importlib.util.decode_source(source)
+    lines = re.split(r"\r\n|\r|\n", source)
+    definitions = []
+
+    def character_column(node):
+        # ast counts columns in UTF-8 bytes; the editor counts characters
+        line = lines[node.lineno - 1]
+        return len(line.encode("utf-8")[:node.col_offset].decode("utf-8", errors="ignore"))
+
+    def visit(node, depth):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.ClassDef):
+                kind = "class"
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                kind = "def"
+            else:
+                # Definitions can sit inside if, try and with blocks
+                if isinstance(child, ast.stmt) or hasattr(child, "body"):
+                    visit(child, depth)
+                continue
+            definitions.append((kind, child.name, child.lineno, character_column(child), depth))
+            visit(child, depth + 1)
+
+    visit(ast.parse(source, filename), 0)
+    return definitions
+
+
+def find_python_files(directory):
+    """Python files under directory, skipping hidden and build directories"""
+    paths = []
+    for root, directories, files in os.walk(directory):
+        directories[:] = sorted(name for name in directories
+                                if not name.startswith(".") and name not in SKIP_DIRECTORIES)
+        for name in sorted(files):
+            if name.endswith(".py"):
+                paths.append(os.path.join(root, name))
+                if len(paths) >= MAX_PROJECT_FILES:
+                    return paths
+    return paths
+
+
+class OutlineCache:
+    """Definitions of the files under one directory, kept on disk between runs.
+
+    May be used from several threads.
+    """
+
+    def __init__(self, directory, cache_dir=CACHE_DIR):
+        self.directory = os.path.abspath(directory)
+        key = hashlib.sha1(self.directory.encode("utf-8", "surrogatepass")).hexdigest()[:16]
+        self.cache_path = os.path.join(cache_dir, f"{key}.json")
+        self.entries = {}
+        self.dirty = False
+        self.parsed = 0
+        self.reused = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == CACHE_VERSION and data.get("directory") == self.directory:
+            self.entries = data["files"]
+
+    def save(self):
+        """Write the cache if it changed; raises OSError"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = json.dumps({"version": CACHE_VERSION, "directory": self.directory,
+                               "files": self.entries})
+            self.dirty = False
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        # Written next to the cache and moved into place, so a crash can't
+        # leave half a file behind
+        partial_path = self.cache_path + ".part"
+        with open(partial_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(partial_path, self.cache_path)
+
+    def definitions(self, path):
+        """Definitions in the file at path, parsed only if its content changed;
+        raises OSError"""
+        stat = os.stat(path)
+        with self.lock:
+            entry = self.entries.get(path)
+        if entry is not None and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            self.reused += 1
+            return [tuple(definition) for definition in entry["definitions"]]
+
+        with open(path, "rb") as f:
+            data = f.read()
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if entry is not None and entry["hash"] == digest:
+            # Touched but not changed
+            definitions = entry["definitions"]
+            self.reused += 1
+        else:
+            try:
+                definitions = parse_definitions(data, path)
+            except (SyntaxError, ValueError):
+                definitions = []
+            self.parsed += 1
+        with self.lock:
+            self.entries[path] = {"mtime": stat.st_mtime_ns, "size": stat.st_size,
+                                  "hash": digest, "definitions": definitions}
+            self.dirty = True
+        return [tuple(definition) for definition in definitions]
+
+    def prune(self, paths):
+        """Forget files that are no longer in paths"""
+        keep = set(paths)
+        with self.lock:
+            for path in [path for path in self.entries if path not in keep]:
+                del self.entries[path]
+                self.dirty = True
+
+
+class OutlineSignals(QObject):
+    """Signals emitted by the outline tasks from the thread pool"""
+    parsed = pyqtSignal(int, object)  # generation, definitions
+    failed = pyqtSignal(int, str)
+    indexed = pyqtSignal(int, object)  # generation, name -> [(path, line, column)]
+
+
+class OutlineTask(QRunnable):
+    """Parses the editor's text for the outline"""
+
+    def __init__(self, generation, source):
+        super().__init__()
+        self.signals = OutlineSignals()
+        self.generation = generation
+        self.source = source
+
+    def run(self):
+        try:
+            definitions = parse_definitions(self.source)
+        except SyntaxError as e:
+            self.signals.failed.emit(self.generation, f"line {e.lineno}: {e.msg}")
+            return
+        except ValueError as e:
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.parsed.emit(self.generation, definitions)
+
+
+class ProjectIndexTask(QRunnable):
+    """Collects the definitions of every Python file under a directory"""
+
+    def __init__(self, generation, cache):
+        super().__init__()
+        self.signals = OutlineSignals()
+        self.generation = generation
+        self.cache = cache
+        self.cancel_requested = False
+
+    def run(self):
+        paths = find_python_files(self.cache.directory)
+        index = {}
+        for path in paths:
+            if self.cancel_requested:
+                break
+            try:
+                definitions = self.cache.definitions(path)
+            except OSError:
+                continue
+            for kind, name, line, column, depth in definitions:
+                index.setdefault(name, []).append((path, line, column))
+        else:
+            self.cache.prune(paths)
+        try:
+            # Whatever was parsed before a cancel is still worth keeping
+            self.cache.save()
+        except OSError as e:
+            self.signals.failed.emit(self.generation, f"Could not save outline cache: {e}")
+        if not self.cancel_requested:
+            self.signals.indexed.emit(self.generation, index)
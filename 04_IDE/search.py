@@ -0,0 +1,210 @@
+"""Find-in-files for the IDE, without any GUI.
+
+iter_files walks a directory tree lazily, leaving out .git and whatever
+the .gitignore files along the way exclude. search_files searches a batch
+of files for a literal or a regular expression and skips binary files; it
+runs in worker processes, so this module must not import Qt.
+"""
+import os
+import re
+
+# Files with a NUL byte in their first bytes are treated as binary
+BINARY_SAMPLE_BYTES = 8192
+
+# Bigger files are skipped rather than read into memory
+MAX_FILE_BYTES = 32 * 2**20
+
+# Matches reported per file, and characters kept of each matching line
+MAX_MATCHES_PER_FILE = 100
+MAX_LINE_CHARS = 300
+
+
+def translate_glob(pattern):
+    """Regex source for a gitignore glob, where * and ? stop at slashes"""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+            continue
+        if char == "*":
+            parts.append("[^/]*")
+        elif char == "?":
+            parts.append("[^/]")
+        elif char == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                parts.append(re.escape(char))
+            else:
+                content = pattern[i + 1:end]
+                if content.startswith("!"):
+                    content = "^" + content[1:]
+                parts.append("[" + content.replace("\\", "\\\\") + "]")
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+
+class GitIgnore:
+    """The patterns of one .gitignore file, for paths below its directory"""
+
+    def __init__(self, directory, lines):
+        self.directory = directory
+        # (regex, negated, directories only, matches the full relative path)
+        self.rules = []
+        for line in lines:
+            line = line.rstrip("\n")
+            if not line.endswith("\\ "):
+                line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            elif line.startswith("\\"):
+                line = line[1:]
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            # A slash anywhere but the end ties the pattern to this directory
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if line:
+                regex = re.compile(translate_glob(line) + r"\Z")
+                self.rules.append((regex, negated, directory_only, anchored))
+
+    @classmethod
+    def from_directory(cls, directory):
+        """The .gitignore in directory, or None if there isn't one"""
+        try:
+            with open(os.path.join(directory, ".gitignore"), "r", encoding="utf-8",
+                      errors="replace") as f:
+                return cls(directory, f.readlines())
+        except OSError:
+            return None
+
+    def match(self, path, is_directory):
+        """True if path is ignored, False if re-included, None if no rule applies"""
+        # Paths come from walking down from this directory
+        relative = path[len(self.directory) + 1:].replace(os.sep, "/")
+        name = relative.rpartition("/")[2]
+        result = None
+        # The last matching rule wins
+        for regex, negated, directory_only, anchored in self.rules:
+            if directory_only and not is_directory:
+                continue
+            if regex.match(relative if anchored else name):
+                result = not negated
+        return result
+
+
+def is_ignored(path, is_directory, ignores):
+    ignored = False
+    for ignore in ignores:
+        result = ignore.match(path, is_directory)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
+def repository_ignores(directory):
+    """.gitignore files in the directories above directory, from the
+    repository root down; none outside a repository"""
+    chain = []
+    current = directory
+    while not os.path.exists(os.path.join(current, ".git")):
+        parent = os.path.dirname(current)
+        if parent == current:
+            return []
+        current = parent
+        chain.append(current)
+    return [ignore for ignore in map(GitIgnore.from_directory, reversed(chain)) if ignore]
+
+
+def iter_files(directory):
+    """Yield the files under directory that are not ignored, as found"""
+    directory = os.path.abspath(directory)
+    stack = [(directory, repository_ignores(directory))]
+    while stack:
+        current, ignores = stack.pop()
+        ignore = GitIgnore.from_directory(current)
+        if ignore is not None:
+            ignores = ignores + [ignore]
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        subdirectories = []
+        for entry in entries:
+            try:
+                is_directory = entry.is_dir(follow_symlinks=False)
+                if not is_directory and not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if entry.name == ".git" or is_ignored(entry.path, is_directory, ignores):
+                continue
+            if is_directory:
+                subdirectories.append((entry.path, ignores))
+            else:
+                yield entry.path
+        # Popped in name order
+        stack.extend(sorted(subdirectories, reverse=True))
+
+
+def compile_query(query, is_regex=False, case_sensitive=True):
+    """The pattern for a query; raises re.error for an invalid regex"""
+    flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
+    return re.compile(query if is_regex else re.escape(query), flags)
+
+
+def search_file(path, regex):
+    """Matching lines of one file as (path, line number, column, line text)"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(MAX_FILE_BYTES + 1)
+    except OSError:
+        return []
+    if len(data) > MAX_FILE_BYTES or b"\0" in data[:BINARY_SAMPLE_BYTES]:
+        return []
+    text = data.decode("utf-8", errors="replace")
+
+    matches = []
+    line_number = 1
+    counted_to = 0
+    line_end = -1
+    for match in regex.finditer(text):
+        start = match.start()
+        if start <= line_end:
+            # One result per line
+            continue
+        line_number += text.count("\n", counted_to, start)
+        counted_to = start
+        line_start = text.rfind("\n", 0, start) + 1
+        line_end = text.find("\n", start)
+        if line_end == -1:
+            line_end = len(text)
+        line = text[line_start:line_end].rstrip("\r")
+        matches.append((path, line_number, start - line_start, line[:MAX_LINE_CHARS]))
+        if len(matches) >= MAX_MATCHES_PER_FILE:
+            break
+    return matches
+
+
+def search_files(paths, query, is_regex=False, case_sensitive=True):
+    """Matches in a batch of files; run in a worker process"""
+    regex = compile_query(query, is_regex, case_sensitive)
+    matches = []
+    for path in paths:
+        matches.extend(search_file(path, regex))
+    return len(paths), matches
@@ -1,106 +1,273 @@
 import sys
-import numpy as np
+import os
+import math
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import filter_engine
+import lut
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                           QHBoxLayout, QPushButton, QFileDialog, QComboBox, QLabel)
-from PyQt6.QtGui import QPainter, QPixmap, QImage, QColor
-from PyQt6.QtCore import Qt
+                           QHBoxLayout, QPushButton, QFileDialog, QComboBox, QLabel,
+                           QSpinBox)
+from PyQt6.QtGui import QPainter, QPixmap, QImage
+from PyQt6.QtCore import (Qt, QObject, QPointF, QRectF, QRunnable, QThreadPool,
+                          pyqtSignal)
+
+# Longest side of the downscaled copy used for quick previews
+PROXY_SIZE = 1024
+
+# Extensions picked up by the batch mode, as in the Load Image dialog
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+# Zoom limits and the factor applied per mouse wheel notch
+MIN_ZOOM = 0.01
+MAX_ZOOM = 32.0
+ZOOM_STEP = 1.25
+
+
+class FilterSignals(QObject):
+    """Signals emitted by FilterTask from the worker thread"""
+    result_ready = pyqtSignal(int, QImage, bool)  # generation, image, is_preview
+
+
+class FilterTask(QRunnable):
+    """Runs a filter on a proxy image first, then at full resolution"""
+    
+    def __init__(self, generation, image, proxy_image, filter_name, params):
+        super().__init__()
+        self.signals = FilterSignals()
+        self.generation = generation
+        self.image = image
+        self.proxy_image = proxy_image
+        self.filter_name = filter_name
+        self.params = params
+        self.cancelled = False
+        
+    def cancel(self):
+        self.cancelled = True
+        
+    def is_cancelled(self):
+        return self.cancelled
+        
+    def run(self):
+        if self.proxy_image is not None:
+            # Neighbourhood sizes are in pixels, so shrink them with the proxy
+            params = dict(self.params)
+            if "radius" in params:
+                scale = self.proxy_image.width() / self.image.width()
+                params["radius"] = max(1, round(params["radius"] * scale))
+            preview = filter_engine.apply_filter(
+                self.proxy_image, self.filter_name, self.is_cancelled, **params)
+            if preview is None:
+                return
+            self.signals.result_ready.emit(self.generation, preview, True)
+            
+        result = filter_engine.apply_filter(
+            self.image, self.filter_name, self.is_cancelled, **self.params)
+        if result is None:
+            return
+        self.signals.result_ready.emit(self.generation, result, False)
+
 
 class ImageCanvas(QWidget):
-    def __init__(self):
+    # Emitted with the filter name and whether the result is only a preview
+    filter_applied = pyqtSignal(str, bool)
+    
+    def __init__(self, cache_bytes=256 * 1024 * 1024):
         super().__init__()
         self.setMinimumSize(600, 400)
         
         # Initialize variables
         self.original_pixmap = None
         self.current_pixmap = None
+        self.original_image = None
+        self.proxy_image = None
+        
+        # View state: screen pixels per original pixel and pan from centre
+        self.zoom = 1.0
+        self.pan = QPointF(0, 0)
+        self.drag_start = None
+        # Mip pyramid of current_pixmap, each level half the previous one;
+        # levels are built on first use
+        self.mip_levels = []
+        
+        # Filter results keyed by source image, filter name and parameters
+        self.filter_cache = filter_engine.FilterCache(cache_bytes)
+        
+        # Filters run on a worker thread; newer requests cancel older ones
+        self.thread_pool = QThreadPool()
+        self.generation = 0
+        self.task = None
+        self.pending = None  # (cache key, filter name) of the task in flight
         
     def load_image(self, file_path):
         self.original_pixmap = QPixmap(file_path)
         if self.original_pixmap.isNull():
             return False
         
-        self.current_pixmap = self.original_pixmap.copy()
-        self.update()
+        self.cancel_filter()
+        # Results computed for the previous image can never be hit again
+        self.filter_cache.clear()
+        
+        # QImage, unlike QPixmap, can be used from worker threads
+        image = self.original_pixmap.toImage()
+        self.original_image = image.convertToFormat(filter_engine.working_format(image))
+        if max(self.original_image.width(), self.original_image.height()) > PROXY_SIZE:
+            self.proxy_image = self.original_image.scaled(
+                PROXY_SIZE, PROXY_SIZE, Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.FastTransformation)
+        else:
+            self.proxy_image = None
+            
+        self.set_current_pixmap(self.original_pixmap.copy())
+        self.fit_to_window()
         return True
         
+    def set_current_pixmap(self, pixmap):
+        self.current_pixmap = pixmap
+        # The pyramid belongs to the old pixmap
+        self.mip_levels = [pixmap]
+        self.update()
+        
+    def mip_level(self, level):
+        while len(self.mip_levels) <= level:
+            previous = self.mip_levels[-1]
+            self.mip_levels.append(previous.scaled(
+                max(1, previous.width() // 2), max(1, previous.height() // 2),
+                Qt.AspectRatioMode.IgnoreAspectRatio,
+                Qt.TransformationMode.SmoothTransformation))
+        return self.mip_levels[level]
+        
+    def fit_to_window(self):
+        if not self.original_pixmap:
+            return
+        self.zoom = min(1.0, self.width() / self.original_pixmap.width(),
+                        self.height() / self.original_pixmap.height())
+        self.pan = QPointF(0, 0)
+        self.update()
+        
+    def image_rect(self):
+        """Where the whole image lands on the widget at the current view"""
+        width = self.original_pixmap.width() * self.zoom
+        height = self.original_pixmap.height() * self.zoom
+        x = (self.width() - width) / 2 + self.pan.x()
+        y = (self.height() - height) / 2 + self.pan.y()
+        return QRectF(x, y, width, height)
+        
     def paintEvent(self, event):
         painter = QPainter(self)
         
         # Clear background
         painter.fillRect(event.rect(), Qt.GlobalColor.white)
         
-        if self.current_pixmap:
-            # Calculate position to center the image
-            x = (self.width() - self.current_pixmap.width()) // 2
-            y = (self.height() - self.current_pixmap.height()) // 2
-            painter.drawPixmap(x, y, self.current_pixmap)
+        if not self.current_pixmap:
+            return
             
-    def apply_filter(self, filter_name):
+        target = self.image_rect()
+        visible = target.intersected(QRectF(self.rect()))
+        if visible.isEmpty():
+            return
+            
+        # Previews are smaller than the original, so the level depends on
+        # pixmap pixels per screen pixel rather than on the zoom alone
+        ratio = self.current_pixmap.width() / target.width()
+        level = int(math.log2(ratio)) if ratio >= 2 else 0
+        pixmap = self.mip_level(level)
+        
+        # Only the visible part of the level is blitted
+        sx = pixmap.width() / target.width()
+        sy = pixmap.height() / target.height()
+        source = QRectF((visible.x() - target.x()) * sx, (visible.y() - target.y()) * sy,
+                        visible.width() * sx, visible.height() * sy)
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, sx > 1)
+        painter.drawPixmap(visible, pixmap, source)
+        
+    def wheelEvent(self, event):
+        if not self.original_pixmap:
+            return
+        steps = event.angleDelta().y() / 120
+        zoom = min(MAX_ZOOM, max(MIN_ZOOM, self.zoom * ZOOM_STEP ** steps))
+        
+        # Keep the image point under the cursor in place
+        cursor = event.position()
+        target = self.image_rect()
+        x = cursor.x() - (cursor.x() - target.x()) * zoom / self.zoom
+        y = cursor.y() - (cursor.y() - target.y()) * zoom / self.zoom
+        self.zoom = zoom
+        width = self.original_pixmap.width() * zoom
+        height = self.original_pixmap.height() * zoom
+        self.pan = QPointF(x - (self.width() - width) / 2, y - (self.height() - height) / 2)
+        self.update()
+        
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.drag_start = event.position()
+            self.setCursor(Qt.CursorShape.ClosedHandCursor)
+            
+    def mouseMoveEvent(self, event):
+        if self.drag_start is not None:
+            self.pan += event.position() - self.drag_start
+            self.drag_start = event.position()
+            self.update()
+            
+    def mouseReleaseEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton:
+            self.drag_start = None
+            self.unsetCursor()
+            
+    def mouseDoubleClickEvent(self, event):
+        self.fit_to_window()
+            
+    def apply_filter(self, filter_name, **params):
         if not self.original_pixmap:
             return
             
-        # Convert QPixmap to QImage for pixel manipulation
-        image = self.original_pixmap.toImage()
-        width = image.width()
-        height = image.height()
-        
-        # Create a new image to store the result
-        result_image = QImage(width, height, QImage.Format.Format_ARGB32)
-        
-        if filter_name == "Grayscale":
-            for y in range(height):
-                for x in range(width):
-                    pixel = image.pixel(x, y)
-                    color = QColor(pixel)
-                    gray = int(0.299 * color.red() + 0.587 * color.green() + 0.114 * color.blue())
-                    result_image.setPixelColor(x, y, QColor(gray, gray, gray))
-                    
-        elif filter_name == "Invert":
-            for y in range(height):
-                for x in range(width):
-                    pixel = image.pixel(x, y)
-                    color = QColor(pixel)
-                    result_image.setPixelColor(x, y, QColor(255 - color.red(), 
-                                                         255 - color.green(), 
-                                                         255 - color.blue()))
-                    
-        elif filter_name == "Sepia":
-            for y in range(height):
-                for x in range(width):
-                    pixel = image.pixel(x, y)
-                    color = QColor(pixel)
-                    r, g, b = color.red(), color.green(), color.blue()
-                    
-                    # Sepia conversion
-                    tr = int(0.393 * r + 0.769 * g + 0.189 * b)
-                    tg = int(0.349 * r + 0.686 * g + 0.168 * b)
-                    tb = int(0.272 * r + 0.534 * g + 0.131 * b)
-                    
-                    # Ensure values are within range
-                    tr = min(255, tr)
-                    tg = min(255, tg)
-                    tb = min(255, tb)
-                    
-                    result_image.setPixelColor(x, y, QColor(tr, tg, tb))
-                    
-        elif filter_name == "Red Channel":
-            for y in range(height):
-                for x in range(width):
-                    pixel = image.pixel(x, y)
-                    color = QColor(pixel)
-                    result_image.setPixelColor(x, y, QColor(color.red(), 0, 0))
-        
-        elif filter_name == "Original":
-            result_image = image.copy()
+        self.cancel_filter()
+        if filter_name == "Original":
+            self.show_result(self.original_pixmap, filter_name, False)
+            return
             
-        # Update the current pixmap
-        self.current_pixmap = QPixmap.fromImage(result_image)
-        self.update()
+        key = filter_engine.FilterCache.make_key(
+            self.original_pixmap.cacheKey(), filter_name, params)
+        pixmap = self.filter_cache.get(key)
+        if pixmap is not None:
+            self.show_result(pixmap, filter_name, False)
+            return
+            
+        # Compute off the GUI thread; a proxy preview arrives first
+        self.pending = (key, filter_name)
+        self.task = FilterTask(self.generation, self.original_image,
+                               self.proxy_image, filter_name, params)
+        self.task.signals.result_ready.connect(self.on_result_ready)
+        self.thread_pool.start(self.task)
+        
+    def cancel_filter(self):
+        # Results still queued from older tasks are ignored by generation
+        self.generation += 1
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.pending = None
+        
+    def on_result_ready(self, generation, image, is_preview):
+        if generation != self.generation or self.pending is None:
+            return
+        key, filter_name = self.pending
+        pixmap = QPixmap.fromImage(image)
+        if not is_preview:
+            self.filter_cache.put(key, pixmap, image.sizeInBytes())
+            self.task = None
+            self.pending = None
+        self.show_result(pixmap, filter_name, is_preview)
+        
+    def show_result(self, pixmap, filter_name, is_preview):
+        self.set_current_pixmap(pixmap)
+        self.filter_applied.emit(filter_name, is_preview)
         
     def reset_image(self):
         if self.original_pixmap:
-            self.current_pixmap = self.original_pixmap.copy()
-            self.update()
+            self.cancel_filter()
+            self.set_current_pixmap(self.original_pixmap.copy())
 
 
 class ImageFilterApp(QMainWindow):
@@ -118,6 +285,7 @@ class ImageFilterApp(QMainWindow):
         
         # Canvas
         self.canvas = ImageCanvas()
+        self.canvas.filter_applied.connect(self.on_filter_applied)
         main_layout.addWidget(self.canvas)
         
         # Status label
@@ -134,10 +302,25 @@ class ImageFilterApp(QMainWindow):
         
         # Filter selection
         self.filter_combo = QComboBox()
-        self.filter_combo.addItems(["Original", "Grayscale", "Invert", "Sepia", "Red Channel"])
+        self.filter_combo.addItems(["Original"] + list(filter_engine.FILTERS))
         self.filter_combo.currentTextChanged.connect(self.apply_filter)
         controls_layout.addWidget(self.filter_combo)
         
+        # Load a .cube colour grading LUT as an extra filter
+        self.lut_btn = QPushButton("Load LUT")
+        self.lut_btn.clicked.connect(self.load_lut)
+        controls_layout.addWidget(self.lut_btn)
+        
+        # Radius for neighbourhood filters such as Gaussian Blur
+        controls_layout.addWidget(QLabel("Radius:"))
+        self.radius_spin = QSpinBox()
+        self.radius_spin.setRange(1, 50)
+        self.radius_spin.setValue(3)
+        self.radius_spin.setEnabled(False)
+        self.radius_spin.valueChanged.connect(
+            lambda: self.apply_filter(self.filter_combo.currentText()))
+        controls_layout.addWidget(self.radius_spin)
+        
         # Reset button
         self.reset_btn = QPushButton("Reset Image")
         self.reset_btn.clicked.connect(self.canvas.reset_image)
@@ -155,17 +338,172 @@ class ImageFilterApp(QMainWindow):
             else:
                 self.status_label.setText("Failed to load image!")
 
+    def load_lut(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Open LUT", "", 
+                                             "Cube LUT Files (*.cube)")
+        if file_path:
+            try:
+                filter_name = lut.register_lut(file_path)
+            except (OSError, ValueError) as e:
+                self.status_label.setText(f"Failed to load LUT: {e}")
+                return
+            # A reloaded file keeps its name, so drop results made with it
+            self.canvas.filter_cache.clear()
+            if self.filter_combo.findText(filter_name) < 0:
+                self.filter_combo.addItem(filter_name)
+            if self.filter_combo.currentText() == filter_name:
+                self.apply_filter(filter_name)
+            else:
+                self.filter_combo.setCurrentText(filter_name)
+
     def apply_filter(self, filter_name):
-        self.canvas.apply_filter(filter_name)
-        self.status_label.setText(f"Filter applied: {filter_name}")
+        params = {}
+        entry = filter_engine.FILTERS.get(filter_name)
+        takes_radius = entry is not None and "radius" in entry.defaults
+        self.radius_spin.setEnabled(takes_radius)
+        if takes_radius:
+            params["radius"] = self.radius_spin.value()
+        self.status_label.setText(f"Applying filter: {filter_name}...")
+        self.canvas.apply_filter(filter_name, **params)
+        
+    def closeEvent(self, event):
+        # A worker still running at interpreter shutdown would abort
+        self.canvas.cancel_filter()
+        self.canvas.thread_pool.waitForDone()
+        event.accept()
+        
+    def on_filter_applied(self, filter_name, is_preview):
+        cache = self.canvas.filter_cache
+        state = "Previewing" if is_preview else "Filter applied"
+        self.status_label.setText(
+            f"{state}: {filter_name} "
+            f"(cache hits: {cache.hits}, misses: {cache.misses})")
+
+
+def parse_filter_chain(text):
+    """Parse "Sepia,Gaussian Blur:radius=5" into [(name, params), ...]"""
+    chain = []
+    for item in text.split(","):
+        # LUT names contain a colon too, so only key=value text is options
+        filter_name, _, options = item.strip().rpartition(":")
+        if not filter_name or "=" not in options:
+            filter_name, options = item.strip(), ""
+        params = {}
+        for option in filter(None, options.split(";")):
+            key, _, value = option.partition("=")
+            for convert in (int, float, str):
+                try:
+                    params[key.strip()] = convert(value.strip())
+                    break
+                except ValueError:
+                    continue
+        chain.append((filter_name.strip(), params))
+    return chain
+
+
+def chain_parameter_errors(chain):
+    """Messages for parameters a filter doesn't take or of the wrong type"""
+    errors = []
+    for filter_name, params in chain:
+        entry = filter_engine.FILTERS.get(filter_name)
+        defaults = entry.defaults if entry is not None else {}
+        for key, value in params.items():
+            if key not in defaults:
+                errors.append(f"{filter_name} has no parameter '{key}'")
+                continue
+            expected = type(defaults[key])
+            # Whole numbers are fine where a float is expected
+            if not isinstance(value, expected) and not (expected is float and type(value) is int):
+                errors.append(f"{filter_name} parameter '{key}' must be "
+                              f"{expected.__name__}, not {value!r}")
+    return errors
+
+
+def init_batch_worker(lut_paths):
+    # Spawned workers start with an empty registry, so load LUTs again
+    for path in lut_paths:
+        lut.register_lut(path)
+
+
+def batch_process(path, output_dir, chain):
+    """Filter one image file without any GUI; runs in a worker process"""
+    start = time.perf_counter()
+    image = QImage(path)
+    if image.isNull():
+        return path, None, "could not read image"
+    try:
+        for filter_name, params in chain:
+            # The process pool already uses every core
+            image = filter_engine.apply_filter(image, filter_name, workers=1, **params)
+    except Exception as e:
+        # One bad image shouldn't stop the rest of the batch
+        return path, None, f"could not filter image: {e}"
+    if not image.save(os.path.join(output_dir, os.path.basename(path))):
+        return path, None, "could not write result"
+    return path, time.perf_counter() - start, None
+
+
+def run_batch(input_dir, output_dir, chain, lut_paths, workers=None):
+    paths = sorted(os.path.join(input_dir, name) for name in os.listdir(input_dir)
+                   if name.lower().endswith(IMAGE_EXTENSIONS))
+    os.makedirs(output_dir, exist_ok=True)
+    
+    start = time.perf_counter()
+    done = failed = 0
+    with ProcessPoolExecutor(workers, initializer=init_batch_worker,
+                             initargs=(lut_paths,)) as pool:
+        futures = [pool.submit(batch_process, path, output_dir, chain) for path in paths]
+        # Each worker writes its own result, so only a summary comes back
+        for future in as_completed(futures):
+            path, seconds, error = future.result()
+            done += 1
+            if error:
+                failed += 1
+                print(f"[{done}/{len(paths)}] {path}: {error}", file=sys.stderr)
+            else:
+                print(f"[{done}/{len(paths)}] {path} ({seconds:.2f} s)")
+    
+    elapsed = time.perf_counter() - start
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"Processed {done} images in {elapsed:.2f} s ({rate:.1f} images/s), "
+          f"{failed} failed")
+    return 1 if failed else 0
 
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Image filter application")
+    parser.add_argument("--batch", nargs=2, metavar=("INPUT_DIR", "OUTPUT_DIR"),
+                        help="filter every image in INPUT_DIR into OUTPUT_DIR without a GUI")
+    parser.add_argument("--filters", default="Grayscale",
+                        help="filter chain for --batch, e.g. 'Sepia,Sharpen:radius=5;amount=1.5'")
+    parser.add_argument("--lut", action="append", default=[], metavar="FILE",
+                        help="register a .cube LUT as the filter 'LUT: <file name>'")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes for --batch")
+    args, qt_args = parser.parse_known_args()
+    
+    if args.batch:
+        if not os.path.isdir(args.batch[0]):
+            parser.error(f"input directory not found: {args.batch[0]}")
+        try:
+            init_batch_worker(args.lut)
+        except (OSError, ValueError) as e:
+            parser.error(f"could not load LUT: {e}")
+        chain = parse_filter_chain(args.filters)
+        unknown = [name for name, _ in chain
+                   if name != "Original" and name not in filter_engine.FILTERS]
+        if unknown:
+            parser.error(f"unknown filter(s): {', '.join(unknown)}")
+        invalid = chain_parameter_errors(chain)
+        if invalid:
+            parser.error("; ".join(invalid))
+        sys.exit(run_batch(*args.batch, chain, args.lut, args.workers))
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     window = ImageFilterApp()
     window.show()
     sys.exit(app.exec())
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,281 @@
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PyQt6.QtGui import QImage
+
+# Registry of filter name -> Filter
+FILTERS = {}
+
+# Pixels per tile so temporaries stay small for large images
+BAND_PIXELS = 1 << 20
+
+
+class Filter:
+    """A registered filter function and how the image has to be tiled for it"""
+
+    def __init__(self, func, halo=None, defaults=None):
+        self.func = func
+        # Callable(**params) giving the border each tile needs; None for
+        # per-pixel filters
+        self.halo = halo
+        self.defaults = defaults or {}
+
+
+def register_filter(name, halo=None, **defaults):
+    """Decorator that adds a vectorized filter to the registry.
+
+    Filters are called as func(src, dst, **params) on uint8 B, G, R, A
+    tiles. For neighbourhood filters src extends halo(**params) pixels
+    beyond dst on every side.
+    """
+    def decorator(func):
+        FILTERS[name] = Filter(func, halo, defaults)
+        return func
+    return decorator
+
+
+def qimage_to_array(image, writable=False):
+    """Return a zero-copy (height, width, 4) uint8 view of a 32-bit QImage.
+
+    Channels are in memory order, which is B, G, R, A for Format_ARGB32 and
+    Format_RGB32 on little-endian machines. The caller must keep the image
+    alive for as long as the view is used.
+    """
+    width, height = image.width(), image.height()
+    ptr = image.bits() if writable else image.constBits()
+    ptr.setsize(image.sizeInBytes())
+    buffer = np.frombuffer(ptr, dtype=np.uint8).reshape(height, image.bytesPerLine())
+    return buffer[:, :width * 4].reshape(height, width, 4)
+
+
+def working_format(image):
+    """32-bit format filters run in; opaque images stay in RGB32 so the
+    result converts to a QPixmap without a copy."""
+    if image.hasAlphaChannel():
+        return QImage.Format.Format_ARGB32
+    return QImage.Format.Format_RGB32
+
+
+def _with_halo(src, top, bottom, halo):
+    """Rows top:bottom plus halo pixels on every side, replicating the edges"""
+    if halo == 0:
+        return src[top:bottom]
+    start = max(0, top - halo)
+    stop = min(src.shape[0], bottom + halo)
+    padding = ((start - (top - halo), bottom + halo - stop), (halo, halo), (0, 0))
+    return np.pad(src[start:stop], padding, mode="edge")
+
+
+def apply_filter(image, filter_name, cancelled=None, workers=None, **params):
+    """Apply a registered filter to a QImage and return a new QImage.
+
+    The image is split into full-width tiles that run in parallel on
+    workers threads (all cores by default); NumPy releases the GIL while
+    it works. If given, cancelled() is polled before each tile and None is
+    returned if it reported True.
+    """
+    source = image.convertToFormat(working_format(image))
+    if filter_name == "Original" or filter_name not in FILTERS:
+        return source.copy()
+
+    result = QImage(source.width(), source.height(), source.format())
+    src = qimage_to_array(source)
+    dst = qimage_to_array(result, writable=True)
+
+    entry = FILTERS[filter_name]
+    params = {**entry.defaults, **params}
+    halo = entry.halo(**params) if entry.halo is not None else 0
+    height, width = src.shape[:2]
+    # Keep tiles tall enough that the halo rows are a small overhead
+    rows = max(1, BAND_PIXELS // max(1, width), 4 * halo)
+
+    def run_tile(top):
+        if cancelled is not None and cancelled():
+            return
+        bottom = min(top + rows, height)
+        entry.func(_with_halo(src, top, bottom, halo), dst[top:bottom], **params)
+
+    with ThreadPoolExecutor(workers or os.cpu_count()) as pool:
+        for _ in pool.map(run_tile, range(0, height, rows)):
+            pass
+    if cancelled is not None and cancelled():
+        return None
+    return result
+
+
+class FilterCache:
+    """LRU cache of filter results bounded by a memory budget in bytes"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+
+    @staticmethod
+    def make_key(source_key, filter_name, params):
+        return (source_key, filter_name, tuple(sorted(params.items())))
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, nbytes):
+        if key in self._entries:
+            self.total_bytes -= self._entries.pop(key)[1]
+        # Results larger than the whole budget are not worth keeping
+        if nbytes > self.max_bytes:
+            return
+        self._entries[key] = (value, nbytes)
+        self.total_bytes += nbytes
+        while self.total_bytes > self.max_bytes:
+            _, (_, evicted_bytes) = self._entries.popitem(last=False)
+            self.total_bytes -= evicted_bytes
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _luminance(src):
+    b, g, r = (src[..., i].astype(np.float32) for i in range(3))
+    return 0.299 * r + 0.587 * g + 0.114 * b
+
+
+@register_filter("Grayscale")
+def grayscale(src, dst):
+    gray = _luminance(src).astype(np.uint8)
+    dst[..., 0] = gray
+    dst[..., 1] = gray
+    dst[..., 2] = gray
+    dst[..., 3] = src[..., 3]
+
+
+@register_filter("Invert")
+def invert(src, dst):
+    np.subtract(255, src[..., :3], out=dst[..., :3])
+    dst[..., 3] = src[..., 3]
+
+
+# Sepia matrix rows are output R, G, B; columns are input R, G, B
+SEPIA_MATRIX = np.array([
+    [0.393, 0.769, 0.189],
+    [0.349, 0.686, 0.168],
+    [0.272, 0.534, 0.131],
+], dtype=np.float32)
+
+
+@register_filter("Sepia")
+def sepia(src, dst):
+    b, g, r = (src[..., i].astype(np.float32) for i in range(3))
+    # Write B, G, R in memory order from the R, G, B matrix rows
+    for channel, row in zip((2, 1, 0), SEPIA_MATRIX):
+        value = row[0] * r + row[1] * g + row[2] * b
+        np.minimum(value, 255, out=value)
+        dst[..., channel] = value.astype(np.uint8)
+    dst[..., 3] = src[..., 3]
+
+
+@register_filter("Red Channel")
+def red_channel(src, dst):
+    dst[..., 0] = 0
+    dst[..., 1] = 0
+    dst[..., 2] = src[..., 2]
+    dst[..., 3] = src[..., 3]
+
+
+def _centre(src, halo):
+    """The part of a tile that excludes its halo"""
+    return src[halo:src.shape[0] - halo, halo:src.shape[1] - halo]
+
+
+def _convolve_separable(region, kernel_y, kernel_x):
+    """Correlate float data with a separable kernel, dropping the halo"""
+    height = region.shape[0] - len(kernel_y) + 1
+    width = region.shape[1] - len(kernel_x) + 1
+    vertical = np.zeros((height,) + region.shape[1:], dtype=np.float32)
+    for i, weight in enumerate(kernel_y):
+        vertical += weight * region[i:i + height]
+    out = np.zeros((height, width) + region.shape[2:], dtype=np.float32)
+    for i, weight in enumerate(kernel_x):
+        out += weight * vertical[:, i:i + width]
+    return out
+
+
+def _convolve2d(region, kernel):
+    """Correlate float data with a small non-separable kernel"""
+    height = region.shape[0] - kernel.shape[0] + 1
+    width = region.shape[1] - kernel.shape[1] + 1
+    out = np.zeros((height, width) + region.shape[2:], dtype=np.float32)
+    for (dy, dx), weight in np.ndenumerate(kernel):
+        if weight:
+            out += weight * region[dy:dy + height, dx:dx + width]
+    return out
+
+
+def gaussian_kernel(radius):
+    """Normalized 1D Gaussian covering +-3 sigma within radius pixels"""
+    sigma = max(radius / 3.0, 0.5)
+    x = np.arange(-radius, radius + 1, dtype=np.float32)
+    kernel = np.exp(-x * x / (2 * sigma * sigma))
+    return kernel / kernel.sum()
+
+
+def _store(dst, src, halo, colour):
+    np.clip(colour + 0.5, 0, 255, out=colour)
+    dst[..., :3] = colour
+    dst[..., 3] = _centre(src, halo)[..., 3]
+
+
+@register_filter("Gaussian Blur", halo=lambda radius, **_: radius, radius=3)
+def gaussian_blur(src, dst, radius):
+    kernel = gaussian_kernel(radius)
+    colour = src[..., :3].astype(np.float32)
+    _store(dst, src, radius, _convolve_separable(colour, kernel, kernel))
+
+
+@register_filter("Sharpen", halo=lambda radius, **_: radius, radius=3, amount=1.0)
+def sharpen(src, dst, radius, amount):
+    # Unsharp mask: add back the difference between the image and its blur
+    kernel = gaussian_kernel(radius)
+    colour = src[..., :3].astype(np.float32)
+    blurred = _convolve_separable(colour, kernel, kernel)
+    centre = _centre(colour, radius)
+    _store(dst, src, radius, centre + amount * (centre - blurred))
+
+
+EMBOSS_KERNEL = np.array([
+    [-2, -1, 0],
+    [-1, 1, 1],
+    [0, 1, 2],
+], dtype=np.float32)
+
+
+@register_filter("Emboss", halo=lambda: 1)
+def emboss(src, dst):
+    colour = src[..., :3].astype(np.float32)
+    _store(dst, src, 1, _convolve2d(colour, EMBOSS_KERNEL))
+
+
+SOBEL_SMOOTH = np.array([1, 2, 1], dtype=np.float32)
+SOBEL_DIFF = np.array([-1, 0, 1], dtype=np.float32)
+
+
+@register_filter("Edge Detect", halo=lambda: 1)
+def edge_detect(src, dst):
+    # Sobel gradient magnitude of the luminance
+    gray = _luminance(src)
+    gx = _convolve_separable(gray, SOBEL_SMOOTH, SOBEL_DIFF)
+    gy = _convolve_separable(gray, SOBEL_DIFF, SOBEL_SMOOTH)
+    magnitude = np.hypot(gx, gy)
+    _store(dst, src, 1, np.repeat(magnitude[..., None], 3, axis=2))
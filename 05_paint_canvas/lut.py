@@ -0,0 +1,126 @@
+import os
+import numpy as np
+import filter_engine
+
+# Parsed LUTs keyed by (path, modification time) so each file is read once
+_LUT_CACHE = {}
+
+
+class CubeLUT:
+    """A 3D colour lookup table stored as a compact float32 array"""
+
+    def __init__(self, table, domain_min=(0.0, 0.0, 0.0), domain_max=(1.0, 1.0, 1.0),
+                 title=""):
+        # (size**3, 3) output R, G, B with the red input index varying fastest
+        self.table = np.ascontiguousarray(table, dtype=np.float32).reshape(-1, 3)
+        self.size = round(len(self.table) ** (1 / 3))
+        if self.size < 2 or self.size ** 3 != len(self.table):
+            raise ValueError(f"LUT has {len(self.table)} entries, not a cube")
+        self.title = title
+
+        # Inputs are 8-bit, so the lattice cell and weight of every input
+        # value can be looked up instead of computed per pixel
+        values = np.arange(256, dtype=np.float32) / 255
+        self.cells = []
+        self.weights = []
+        for channel in range(3):
+            low, high = domain_min[channel], domain_max[channel]
+            position = np.clip((values - low) / (high - low), 0, 1) * (self.size - 1)
+            cell = np.minimum(position.astype(np.int32), self.size - 2)
+            self.cells.append(cell)
+            self.weights.append(position - cell)
+
+        # Interpolate along red for all 256 input levels up front. That
+        # leaves a bilinear blend of 4 lookups per pixel instead of 8, from
+        # a (size, size, 256) table of 8-bit-scaled values padded to 4
+        # floats so each entry is fetched as a single 16 byte item.
+        n = self.size
+        cube = np.clip(self.table.reshape(n, n, n, 3), 0, 1) * 255 + 0.5
+        cell, weight = self.cells[0], self.weights[0][:, None]
+        expanded = np.zeros((n, n, 256, 4), dtype=np.float32)
+        expanded[..., :3] = cube[:, :, cell] * (1 - weight) + cube[:, :, cell + 1] * weight
+        self._expanded = expanded.reshape(-1, 4).view(np.complex128).ravel()
+
+    def _lookup(self, index, shape):
+        return self._expanded[index].view(np.float32).reshape(shape)
+
+    def apply(self, src, dst):
+        """Trilinearly interpolate B, G, R, A pixels from src into dst"""
+        n = self.size
+        b, g, r = (src[..., i] for i in range(3))
+        index = (self.cells[2][b] * n + self.cells[1][g]) * 256 + r
+        fg = self.weights[1][g][..., None]
+        fb = self.weights[2][b][..., None]
+        shape = src.shape[:2] + (4,)
+
+        # Blend along green at the lower and upper blue planes, then blue
+        blue_planes = []
+        for offset in (0, n * 256):
+            low = self._lookup(index + offset, shape)
+            high = self._lookup(index + offset + 256, shape)
+            high -= low
+            high *= fg
+            low += high
+            blue_planes.append(low)
+        out, upper = blue_planes
+        upper -= out
+        upper *= fb
+        out += upper
+
+        # Entries were clipped and biased for rounding, so a cast is enough.
+        # Table rows are R, G, B; the image is B, G, R in memory.
+        dst[..., :3] = out[..., 2::-1]
+        dst[..., 3] = src[..., 3]
+
+
+def parse_cube(text):
+    """Parse the text of an Adobe/Resolve .cube file into a CubeLUT"""
+    title = ""
+    size = None
+    domain_min = (0.0, 0.0, 0.0)
+    domain_max = (1.0, 1.0, 1.0)
+    data = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        keyword = line.split(None, 1)[0]
+        if keyword == "TITLE":
+            title = line[len(keyword):].strip().strip('"')
+        elif keyword == "LUT_3D_SIZE":
+            size = int(line.split()[1])
+        elif keyword == "LUT_1D_SIZE":
+            raise ValueError("1D LUTs are not supported")
+        elif keyword == "DOMAIN_MIN":
+            domain_min = tuple(float(v) for v in line.split()[1:4])
+        elif keyword == "DOMAIN_MAX":
+            domain_max = tuple(float(v) for v in line.split()[1:4])
+        elif keyword[0].isalpha():
+            # Unknown keywords such as LUT_3D_INPUT_RANGE are ignored
+            continue
+        else:
+            data.append(line)
+
+    if size is None:
+        raise ValueError("Missing LUT_3D_SIZE")
+    table = np.array(" ".join(data).split(), dtype=np.float32)
+    if len(table) != size ** 3 * 3:
+        raise ValueError(f"Expected {size ** 3} entries, found {len(table) // 3}")
+    return CubeLUT(table, domain_min, domain_max, title)
+
+
+def load_cube(path):
+    """Load a .cube file, reusing the parsed table if the file is unchanged"""
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    if key not in _LUT_CACHE:
+        with open(path, "r") as f:
+            _LUT_CACHE[key] = parse_cube(f.read())
+    return _LUT_CACHE[key]
+
+
+def register_lut(path):
+    """Load a .cube file and register it as a filter, returning its name"""
+    cube = load_cube(path)
+    name = f"LUT: {os.path.basename(path)}"
+    filter_engine.register_filter(name)(cube.apply)
+    return name